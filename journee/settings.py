@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -82,6 +83,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/ref/settings/#caches
+
+# Matchmaking's use_cache needs a cache shared by every process, so that a change
+# saved by any of them invalidates the results cached by the others. Without one,
+# Django's per-process default is used and use_cache is refused.
+if "REDIS_URL" in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
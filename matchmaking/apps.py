@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MatchmakingConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "matchmaking"
+
+    def ready(self) -> None:
+        # Connect the signal receivers
+        from matchmaking import signals  # noqa: F401
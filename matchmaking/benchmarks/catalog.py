@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import List, Type
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Model
+
+from matchmaking.cache import bump_catalog_version
+from matchmaking.filters.experience_types import FOOD_EXPERIENCE_TYPE_NAMES
+from matchmaking.models import (
+    City,
+    CityData,
+    Country,
+    CountryData,
+    Destination,
+    DestinationData,
+    Experience,
+    ExperienceData,
+    ExperienceThemeMinimumRatings,
+    ExperienceThemeMinimumRatingsData,
+    ExperienceThemes,
+    ExperienceType,
+    ExperienceTypeData,
+    Itinerary,
+    ItineraryData,
+    ItinerarySummary,
+    Shell,
+    ShellData,
+)
+from matchmaking.summaries import rebuild_summaries
+from matchmaking.tm_form import TmFormRatings, TripParameters
+
+# Synthetic catalogs for benchmarking. They're built from a seeded random
+# generator, so a given size and seed always produce the same catalog, and like
+# real data a few shells and experiences are shared by many itineraries.
+
+COUNTRY_NAMES = [f"Country {i}" for i in range(40)]
+EXPERIENCE_TYPE_NAMES = [
+    *sorted(FOOD_EXPERIENCE_TYPE_NAMES),
+    *(f"Experience type {i}" for i in range(18)),
+]
+THEMES = ExperienceThemes.values
+THEME_RATINGS = [
+    (theme, rating) for theme in range(len(THEMES)) for rating in range(1, 6)
+]
+FEARS_PHOBIAS_MEDICAL = Experience.FearPhobiasMedical.values
+DIETARY_REQUIREMENTS = Experience.DietaryRequirement.values
+EXPERIENCES_PER_ITINERARY = 3
+
+
+@dataclass
+class CatalogSpec:
+    """
+    Everything needed to build the same catalog in memory or in the database
+    """
+
+    size: int
+    seed: int = 0
+
+    @property
+    def shells(self) -> int:
+        return max(10, self.size // 50)
+
+    @property
+    def experiences(self) -> int:
+        return max(30, self.size // 20)
+
+    @property
+    def cities(self) -> int:
+        return max(20, self.size // 500)
+
+
+@dataclass
+class _Rows:
+    city_countries: List[int]
+    shells: List[tuple[int, int, int, int, int]]
+    experiences: List[
+        tuple[List[int], List[str], List[str], int, List[int], List[tuple[int, int]]]
+    ]
+    itineraries: List[tuple[int, List[int]]]
+
+
+def _generate_rows(spec: CatalogSpec) -> _Rows:
+    rng = random.Random(spec.seed)
+
+    city_countries = [rng.randrange(len(COUNTRY_NAMES)) for _ in range(spec.cities)]
+    shells = [
+        (
+            rng.randrange(spec.cities),
+            rng.randrange(spec.cities),
+            rng.randrange(spec.cities),
+            rng.randint(2, 14),
+            rng.randint(60, 600),
+        )
+        for _ in range(spec.shells)
+    ]
+    experiences = [
+        (
+            sorted(rng.sample(range(1, 13), rng.randint(3, 12))),
+            rng.sample(FEARS_PHOBIAS_MEDICAL, rng.randint(0, 2)),
+            rng.sample(DIETARY_REQUIREMENTS, rng.randint(0, 2)),
+            rng.randint(30, 480),
+            rng.sample(range(len(EXPERIENCE_TYPE_NAMES)), rng.randint(1, 2)),
+            [
+                (theme, rng.randint(1, 5))
+                for theme in rng.sample(range(len(THEMES)), rng.randint(0, 2))
+            ],
+        )
+        for _ in range(spec.experiences)
+    ]
+    itineraries = [
+        (
+            rng.randrange(spec.shells),
+            rng.sample(range(spec.experiences), EXPERIENCES_PER_ITINERARY),
+        )
+        for _ in range(spec.size)
+    ]
+
+    return _Rows(city_countries, shells, experiences, itineraries)
+
+
+def build_in_memory_catalog(spec: CatalogSpec) -> List[ItineraryData]:
+    rows = _generate_rows(spec)
+
+    countries = [CountryData(name=name) for name in COUNTRY_NAMES]
+    cities = [
+        CityData(country=countries[country], id=i, name=f"City {i}")
+        for i, country in enumerate(rows.city_countries)
+    ]
+    experience_types = [
+        ExperienceTypeData(name=name, type="", affected_by_group_private=False)
+        for name in EXPERIENCE_TYPE_NAMES
+    ]
+    theme_minimum_ratings = {
+        (theme, rating): ExperienceThemeMinimumRatingsData(
+            theme=THEMES[theme], rating=rating
+        )
+        for theme, rating in THEME_RATINGS
+    }
+    shells = [
+        ShellData(
+            destination=DestinationData(primary_city=cities[city], name=f"Dest {i}"),
+            flying_to_city=cities[flying_to],
+            flying_back_from_city=cities[flying_back_from],
+            length=length,
+            transport_duration_minutes=transport_duration_minutes,
+            id=i,
+        )
+        for i, (
+            city,
+            flying_to,
+            flying_back_from,
+            length,
+            transport_duration_minutes,
+        ) in enumerate(rows.shells)
+    ]
+    experiences = [
+        ExperienceData(
+            experience_types=[experience_types[t] for t in types],
+            theme_minimum_ratings=[theme_minimum_ratings[t] for t in themes],
+            months=months,
+            fears_phobias_medical=fears,
+            unsuitable_for_dietary_requirement=dietary,
+            duration_minutes=duration,
+            id=i,
+        )
+        for i, (months, fears, dietary, duration, types, themes) in enumerate(
+            rows.experiences
+        )
+    ]
+
+    return [
+        ItineraryData(
+            shell=shells[shell],
+            experiences=[experiences[e] for e in experience_ids],
+            id=i,
+        )
+        for i, (shell, experience_ids) in enumerate(rows.itineraries)
+    ]
+
+
+# Every table build_database_catalog replaces
+DATABASE_CATALOG_MODELS: List[Type[Model]] = [
+    ItinerarySummary,
+    Itinerary.experiences.through,
+    Itinerary,
+    Shell,
+    Destination,
+    Experience.experience_types.through,
+    Experience.theme_minimum_ratings.through,
+    Experience,
+    ExperienceType,
+    ExperienceThemeMinimumRatings,
+    City,
+    Country,
+]
+
+
+@transaction.atomic
+def build_database_catalog(spec: CatalogSpec, batch_size: int = 10_000) -> None:
+    """
+    Replace the matchmaking tables with the catalog, for the ORM benchmarks
+    """
+    rows = _generate_rows(spec)
+
+    # Flushed in SQL, TRUNCATE ... CASCADE on Postgres, as deleting through the
+    # ORM would load every row and send its delete signals
+    tables = [model._meta.db_table for model in DATABASE_CATALOG_MODELS]
+    connection.ops.execute_sql_flush(
+        connection.ops.sql_flush(no_style(), tables, allow_cascade=True)
+    )
+
+    countries = Country.objects.bulk_create(
+        [Country(name=name) for name in COUNTRY_NAMES]
+    )
+    cities = City.objects.bulk_create(
+        [
+            City(country=countries[country], name=f"City {i}")
+            for i, country in enumerate(rows.city_countries)
+        ]
+    )
+    experience_types = ExperienceType.objects.bulk_create(
+        [
+            ExperienceType(name=name, affected_by_group_private=False)
+            for name in EXPERIENCE_TYPE_NAMES
+        ]
+    )
+    theme_minimum_ratings = dict(
+        zip(
+            THEME_RATINGS,
+            ExperienceThemeMinimumRatings.objects.bulk_create(
+                [
+                    ExperienceThemeMinimumRatings(theme=THEMES[theme], rating=rating)
+                    for theme, rating in THEME_RATINGS
+                ]
+            ),
+        )
+    )
+    destinations = Destination.objects.bulk_create(
+        [
+            Destination(primary_city=cities[city], name=f"Dest {i}")
+            for i, (city, *_) in enumerate(rows.shells)
+        ]
+    )
+    shells = Shell.objects.bulk_create(
+        [
+            Shell(
+                destination=destinations[i],
+                flying_to_city=cities[flying_to],
+                flying_back_from_city=cities[flying_back_from],
+                length=length,
+                transport_duration_minutes=transport_duration_minutes,
+            )
+            for i, (
+                _,
+                flying_to,
+                flying_back_from,
+                length,
+                transport_duration_minutes,
+            ) in enumerate(rows.shells)
+        ]
+    )
+    experiences = Experience.objects.bulk_create(
+        [
+            Experience(
+                months=months,
+                fears_phobias_medical=fears,
+                unsuitable_for_dietary_requirement=dietary,
+                duration_minutes=duration,
+            )
+            for months, fears, dietary, duration, *_ in rows.experiences
+        ],
+        batch_size=batch_size,
+    )
+    ExperienceTypesThrough = Experience.experience_types.through
+    ExperienceTypesThrough.objects.bulk_create(
+        [
+            ExperienceTypesThrough(
+                experience_id=experiences[i].id,
+                experiencetype_id=experience_types[t].id,
+            )
+            for i, (*_, types, _) in enumerate(rows.experiences)
+            for t in types
+        ],
+        batch_size=batch_size,
+    )
+    ThemeMinimumRatingsThrough = Experience.theme_minimum_ratings.through
+    ThemeMinimumRatingsThrough.objects.bulk_create(
+        [
+            ThemeMinimumRatingsThrough(
+                experience_id=experiences[i].id,
+                experiencethememinimumratings_id=theme_minimum_ratings[t].id,
+            )
+            for i, (*_, themes) in enumerate(rows.experiences)
+            for t in themes
+        ],
+        batch_size=batch_size,
+    )
+
+    ItineraryExperiencesThrough = Itinerary.experiences.through
+    for start in range(0, spec.size, batch_size):
+        batch = rows.itineraries[start : start + batch_size]
+        itineraries = Itinerary.objects.bulk_create(
+            [Itinerary(shell=shells[shell]) for shell, _ in batch]
+        )
+        ItineraryExperiencesThrough.objects.bulk_create(
+            [
+                ItineraryExperiencesThrough(
+                    itinerary_id=itinerary.id, experience_id=experiences[e].id
+                )
+                for itinerary, (_, experience_ids) in zip(itineraries, batch)
+                for e in experience_ids
+            ]
+        )
+
+    # bulk_create sends no signals, so the summaries and cached results that
+    # depend on the catalog are brought up to date here
+    rebuild_summaries(Itinerary.objects.all(), batch_size=batch_size)
+    transaction.on_commit(bump_catalog_version)
+
+
+def generate_trip_parameters(count: int, seed: int = 0) -> List[TripParameters]:
+    """
+    A spread of trip parameters, covering every pace and month
+    """
+    rng = random.Random(seed)
+
+    return [
+        TripParameters(
+            num_travellers=rng.randint(1, 4),
+            length=rng.randint(2, 14),
+            ratings=TmFormRatings(
+                outdoor=rng.uniform(1, 5),
+                nature=rng.uniform(1, 5),
+                villages=rng.uniform(1, 5),
+                sites=rng.uniform(1, 5),
+                history=rng.uniform(1, 5),
+                museums_art=rng.uniform(1, 5),
+                shows=rng.uniform(1, 5),
+                rr=rng.uniform(1, 5),
+                wildlife=rng.uniform(1, 5),
+                food=rng.uniform(1, 5),
+            ),
+            pace=i % 5 + 1,
+            fears_phobias_medical=rng.sample(FEARS_PHOBIAS_MEDICAL, rng.randint(0, 2)),
+            dietary=rng.sample(DIETARY_REQUIREMENTS, rng.randint(0, 2)),
+            location_exclusions=[
+                rng.choice([f"City {rng.randrange(20)}", rng.choice(COUNTRY_NAMES)])
+                for _ in range(rng.randint(0, 2))
+            ],
+            main_month_int=i % 12 + 1,
+        )
+        for i in range(count)
+    ]
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List
+
+from matchmaking.benchmarks.runner import STAGES
+from matchmaking.filters.django_matchmaking import ItineraryFilters
+from matchmaking.models import Itinerary
+from matchmaking.tm_form import TripParameters
+
+INDEX_SCAN = re.compile(
+    r"(?:Index Scan|Index Only Scan|Bitmap Index Scan) (?:using|on) (\w+)"
+)
+
+
+def index_scans(plan: str) -> List[str]:
+    """
+    Names of the indexes a Postgres query plan scans
+    """
+    return sorted(set(INDEX_SCAN.findall(plan)))
+
+
+def explain_stages(trip_params: TripParameters, analyze: bool = True) -> Dict[str, str]:
+    """
+    Postgres query plan of each ItineraryFilters stage on its own, then the run
+    """
+    plans = {}
+
+    for stage, call in STAGES.items():
+        filters = ItineraryFilters(Itinerary.objects.all())
+        if not hasattr(filters, stage):
+            continue
+
+        call(filters, trip_params)
+        plans[stage] = filters.qs.explain(analyze=analyze)
+
+    return plans
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import tracemalloc
+from typing import List
+
+from matchmaking.models import (
+    CityData,
+    CountryData,
+    DestinationData,
+    Experience,
+    ExperienceData,
+    ExperienceThemeMinimumRatingsData,
+    ExperienceThemes,
+    ExperienceTypeData,
+    ItineraryData,
+    ShellData,
+)
+
+
+def distinct_itinerary(index: int) -> ItineraryData:
+    """
+    Itinerary with its own shell and cities, and three experiences of two
+    types each, with two minimum ratings, six months and three fears and three
+    dietary flags
+    """
+    country = CountryData(name=f"Country {index}")
+    cities = [
+        CityData(id=index * 3 + i, name=f"City {index}.{i}", country=country)
+        for i in range(3)
+    ]
+    shell = ShellData(
+        destination=DestinationData(
+            name=f"Destination {index}", primary_city=cities[0]
+        ),
+        flying_to_city=cities[1],
+        flying_back_from_city=cities[2],
+        length=7,
+        transport_duration_minutes=240,
+    )
+    experiences = [
+        ExperienceData(
+            experience_types=[
+                ExperienceTypeData(
+                    name=f"Type {j}",
+                    type="Hiking",
+                    affected_by_group_private=False,
+                )
+                for j in range(2)
+            ],
+            theme_minimum_ratings=[
+                ExperienceThemeMinimumRatingsData(theme=theme, rating=3)
+                for theme in ExperienceThemes.values[:2]
+            ],
+            months=[1, 2, 3, 4, 5, 6],
+            fears_phobias_medical=Experience.FearPhobiasMedical.values[:3],
+            unsuitable_for_dietary_requirement=Experience.DietaryRequirement.values[:3],
+            duration_minutes=120,
+        )
+        for i in range(3)
+    ]
+
+    return ItineraryData(id=index, shell=shell, experiences=experiences)
+
+
+def bytes_per_itinerary(count: int = 20_000) -> float:
+    """
+    Memory allocated per itinerary by building count distinct itineraries, as
+    traced by tracemalloc
+    """
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        itineraries: List[ItineraryData] = [
+            distinct_itinerary(index) for index in range(count)
+        ]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del itineraries
+
+    return (after - before) / count
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence
+
+from matchmaking.filters.compiled_matchmaking import (
+    CompiledCatalog,
+    CompiledItineraryFilters,
+)
+from matchmaking.filters.django_matchmaking import ItineraryFilters
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.indexed_matchmaking import (
+    IndexedItineraryFilters,
+    ItineraryIndex,
+)
+from matchmaking.filters.locations import LocationIndex
+from matchmaking.models import Itinerary, ItineraryData
+from matchmaking.tm_form import TripParameters
+
+# Results are keyed "<engine>/<catalog size>/<stage>", with the full run under
+# the "run" stage, and each maps metric names to values
+Metrics = Dict[str, float]
+Results = Dict[str, Metrics]
+
+# Metrics that are worse when higher, checked for regressions against a baseline
+COMPARED_METRICS = ["p50_ms", "p95_ms", "peak_memory_kb"]
+
+STAGES: Dict[str, Callable[[Any, TripParameters], None]] = {
+    "experience_months": lambda filters, trip_params: filters.experience_months(
+        main_month_int=trip_params.main_month_int
+    ),
+    "experience_fears_phobias_medical": lambda filters, trip_params: (
+        filters.experience_fears_phobias_medical(
+            fears_phobias_medical=trip_params.fears_phobias_medical
+        )
+    ),
+    "experience_theme_minimum_ratings": lambda filters, trip_params: (
+        filters.experience_theme_minimum_ratings(
+            ratings=trip_params.ratings.normalised_rounded
+        )
+    ),
+    "filter_severe_dietary_exclusions": lambda filters, trip_params: (
+        filters.filter_severe_dietary_exclusions(dietary=trip_params.dietary)
+    ),
+    "experiences_dietary_requirements": lambda filters, trip_params: (
+        filters.experiences_dietary_requirements(dietary=trip_params.dietary)
+    ),
+    "dining_experiences_solo_travellers": lambda filters, trip_params: (
+        filters.dining_experiences_solo_travellers(
+            num_travellers=trip_params.num_travellers
+        )
+    ),
+    "filter_itinerary_pace": lambda filters, trip_params: (
+        filters.filter_itinerary_pace(pace=trip_params.pace)
+    ),
+    "filter_location_exclusions": lambda filters, trip_params: (
+        filters.filter_location_exclusions(
+            location_exclusions=trip_params.location_exclusions
+        )
+    ),
+    "run": lambda filters, trip_params: filters.run(trip_params),
+}
+
+
+@dataclass
+class Engine:
+    """
+    A filters class over one catalog. Each measured call starts from fresh
+    filters, and counts the results so lazy engines are evaluated too.
+    """
+
+    name: str
+    new_filters: Callable[[], Any]
+    count_results: Callable[[Any], int]
+
+
+def in_memory_engine(catalog: List[ItineraryData]) -> Engine:
+    # Built once up front, as a long-lived process would
+    location_index = LocationIndex.build(catalog)
+
+    return Engine(
+        name="in_memory",
+        new_filters=lambda: InMemoryItineraryFilters(catalog, location_index),
+        count_results=lambda filters: len(filters.itineraries),
+    )
+
+
+def compiled_engine(catalog: List[ItineraryData]) -> Engine:
+    compiled_catalog = CompiledCatalog.compile(catalog)
+
+    return Engine(
+        name="compiled",
+        new_filters=lambda: CompiledItineraryFilters(compiled_catalog),
+        count_results=lambda filters: int(filters.mask.sum()),
+    )
+
+
+def indexed_engine(catalog: List[ItineraryData]) -> Engine:
+    index = ItineraryIndex(catalog)
+
+    return Engine(
+        name="indexed",
+        new_filters=lambda: IndexedItineraryFilters(index),
+        count_results=lambda filters: len(filters.itineraries),
+    )
+
+
+def orm_engine() -> Engine:
+    return Engine(
+        name="orm",
+        new_filters=lambda: ItineraryFilters(Itinerary.objects.all()),
+        count_results=lambda filters: len(filters.qs.values_list("id", flat=True)),
+    )
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """
+    Linearly interpolated percentile of the samples, fraction being 0 to 1
+    """
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarise(
+    samples: Sequence[float], catalog_size: int, peak_memory: int, results: float
+) -> Metrics:
+    """
+    Metrics of a stage from its timings in seconds, one per call
+    """
+    return {
+        "calls": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 0.5) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        # Itineraries filtered per second
+        "throughput": catalog_size * len(samples) / sum(samples),
+        "peak_memory_kb": peak_memory / 1024,
+        "mean_results": results,
+    }
+
+
+def benchmark_stage(
+    engine: Engine,
+    stage: str,
+    trip_params_list: Sequence[TripParameters],
+    catalog_size: int,
+    repeat: int = 1,
+) -> Metrics:
+    call = STAGES[stage]
+    samples = []
+    results = 0
+
+    for _ in range(repeat):
+        for trip_params in trip_params_list:
+            filters = engine.new_filters()
+            start = time.perf_counter()
+            call(filters, trip_params)
+            results += engine.count_results(filters)
+            samples.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocations down, so memory is measured separately
+    tracemalloc.start()
+    try:
+        filters = engine.new_filters()
+        call(filters, trip_params_list[0])
+        engine.count_results(filters)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return summarise(
+        samples,
+        catalog_size=catalog_size,
+        peak_memory=peak_memory,
+        results=results / len(samples),
+    )
+
+
+def benchmark_engine(
+    engine: Engine,
+    trip_params_list: Sequence[TripParameters],
+    catalog_size: int,
+    repeat: int = 1,
+) -> Results:
+    """
+    Time every stage the engine's filters have on their own, then the full run
+    """
+    filters = engine.new_filters()
+
+    return {
+        f"{engine.name}/{catalog_size}/{stage}": benchmark_stage(
+            engine,
+            stage,
+            trip_params_list=trip_params_list,
+            catalog_size=catalog_size,
+            repeat=repeat,
+        )
+        for stage in STAGES
+        if hasattr(filters, stage)
+    }
+
+
+@dataclass(frozen=True)
+class Regression:
+    key: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline
+
+    def __str__(self) -> str:
+        return (
+            f"{self.key} {self.metric}: {self.baseline:.3f} -> {self.current:.3f} "
+            f"({self.change:+.0%})"
+        )
+
+
+def compare(baseline: Results, current: Results, threshold: float) -> List[Regression]:
+    """
+    Metrics that got worse than the baseline by more than threshold, e.g. 0.1 for
+    10%. Only results present in both are compared.
+    """
+    regressions = []
+
+    for key in sorted(baseline.keys() & current.keys()):
+        for metric in COMPARED_METRICS:
+            before, after = baseline[key].get(metric), current[key].get(metric)
+            if not before or after is None:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append(Regression(key, metric, before, after))
+
+    return regressions
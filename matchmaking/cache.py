@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Callable, Generic, Hashable, Optional, TypeVar
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+if TYPE_CHECKING:
+    from matchmaking.tm_form import TripParameters
+
+# Matchmaking results are cached per process, keyed on the trip parameters and
+# the catalog version. The version lives in Django's cache, which has to be shared
+# so that a change saved by any worker invalidates results in all of them.
+
+CATALOG_VERSION_KEY = "matchmaking:catalog_version"
+
+# Backends that every process keeps to itself, so can't share the version
+UNSHARED_CACHE_BACKENDS = (DummyCache, LocMemCache)
+
+# Results with more ids than this aren't cached, since they'd be fetched again
+# with an id__in list just as long
+MAX_CACHED_RESULT_IDS = 1000
+
+T = TypeVar("T")
+
+
+def check_shared_cache() -> None:
+    if isinstance(caches["default"], UNSHARED_CACHE_BACKENDS):
+        raise ImproperlyConfigured(
+            "Caching matchmaking results needs a cache backend shared by every "
+            "process, so that catalog changes invalidate them everywhere"
+        )
+
+
+def catalog_version() -> int:
+    version = cache.get_or_set(CATALOG_VERSION_KEY, 0, timeout=None)
+    return int(version or 0)
+
+
+async def acatalog_version() -> int:
+    version = await cache.aget_or_set(CATALOG_VERSION_KEY, 0, timeout=None)
+    return int(version or 0)
+
+
+def bump_catalog_version() -> None:
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # The key was missing or evicted, any new value invalidates the old results
+        cache.set(CATALOG_VERSION_KEY, catalog_version() + 1, timeout=None)
+
+
+def trip_parameters_key(trip_params: TripParameters) -> str:
+    """
+    Hash of the trip parameters in canonical form, so that forms which can only
+    ever match the same itineraries share a key
+    """
+    canonical = {
+        "num_travellers": trip_params.num_travellers,
+        "length": trip_params.length,
+        # The filters only ever see the normalised, rounded ratings
+        "ratings": asdict(trip_params.ratings.normalised_rounded),
+        "pace": trip_params.pace,
+        "fears_phobias_medical": sorted(set(trip_params.fears_phobias_medical)),
+        "dietary": sorted(set(trip_params.dietary)),
+        # Location exclusions are matched case insensitively
+        "location_exclusions": sorted(
+            {location.lower() for location in trip_params.location_exclusions}
+        ),
+        "main_month_int": trip_params.main_month_int,
+    }
+    encoded = json.dumps(canonical, sort_keys=True).encode()
+
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache(Generic[T]):
+    """
+    Thread safe cache that evicts the least recently used entry once full
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, T] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: Hashable, value: T) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        value = self.get(key)
+
+        if value is None:
+            value = compute()
+            self.set(key, value)
+
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Itinerary ids matched by after_matchmaking_filters
+matchmaking_results: ResultCache[tuple[int, ...]] = ResultCache()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from matchmaking.filters.compiled_matchmaking import (
+    CompiledCatalog,
+    CompiledItineraryFilters,
+)
+from matchmaking.filters.locations import fold_location
+from matchmaking.models import Experience, ItineraryData
+from matchmaking.tm_form import TripParameters
+
+StageMasks = Dict[Tuple[str, Hashable], npt.NDArray[np.bool_]]
+
+
+class BatchItineraryFilters:
+    """
+    Runs the same filters as ItineraryFilters, which are behind
+    after_matchmaking_filters, for many leads in one go over a compiled
+    catalog, as a leads x itineraries boolean matrix.
+
+    Everything per itinerary is computed once, by compiling the catalog. The
+    month, pace, severe dietary and solo dining masks are computed once per
+    distinct argument, of which there are only a handful, and kept for later
+    calls. Fears, dietary requirements and theme ratings vary far more, so
+    their masks are only shared by the leads of one call. Location exclusions
+    are checked for every lead together.
+
+    Location names are matched ignoring accents as well as case, where the
+    ORM only ignores case.
+    """
+
+    def __init__(self, catalog: CompiledCatalog) -> None:
+        self.catalog = catalog
+        self._stage_masks: StageMasks = {}
+        self._route_cache: Optional[
+            Tuple[npt.NDArray[np.int32], npt.NDArray[np.intp]]
+        ] = None
+
+    def _stage_mask(
+        self,
+        stage: str,
+        argument: Hashable,
+        apply: Callable[[CompiledItineraryFilters], None],
+        stage_masks: Optional[StageMasks] = None,
+    ) -> npt.NDArray[np.bool_]:
+        stage_masks = self._stage_masks if stage_masks is None else stage_masks
+        mask = stage_masks.get((stage, argument))
+
+        if mask is None:
+            filters = CompiledItineraryFilters(catalog=self.catalog)
+            apply(filters)
+            mask = stage_masks[stage, argument] = filters.mask
+
+        return mask
+
+    def _routes(self) -> Tuple[npt.NDArray[np.int32], npt.NDArray[np.intp]]:
+        """
+        The distinct location rows of the catalog, there being far fewer of them
+        than itineraries, and the position of each itinerary's row among them
+        """
+        if self._route_cache is None:
+            routes, route_positions = np.unique(
+                self.catalog.location_ids, axis=0, return_inverse=True
+            )
+            self._route_cache = routes, route_positions.reshape(-1)
+
+        return self._route_cache
+
+    def match_matrix(
+        self, trip_params_list: Sequence[TripParameters]
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Row i is the mask of itineraries matching trip_params_list[i]
+        """
+        matrix = np.empty((len(trip_params_list), len(self.catalog)), dtype=np.bool_)
+
+        # Masks of the high cardinality stages, shared by this call's leads only
+        lead_masks: StageMasks = {}
+
+        for row, trip_params in zip(matrix, trip_params_list):
+            fears_phobias_medical = tuple(
+                sorted(set(trip_params.fears_phobias_medical))
+            )
+            dietary = tuple(sorted(set(trip_params.dietary)))
+            ratings = trip_params.ratings.normalised_rounded
+
+            # Filter: experience months
+            row[:] = self._stage_mask(
+                "experience_months",
+                trip_params.main_month_int,
+                lambda filters: filters.experience_months(
+                    main_month_int=trip_params.main_month_int
+                ),
+            )
+
+            # Filter: experience fears, phobias, and medical
+            row &= self._stage_mask(
+                "experience_fears_phobias_medical",
+                fears_phobias_medical,
+                lambda filters: filters.experience_fears_phobias_medical(
+                    fears_phobias_medical=list(fears_phobias_medical)
+                ),
+                lead_masks,
+            )
+
+            # Filter: experience minimum ratings
+            row &= self._stage_mask(
+                "experience_theme_minimum_ratings",
+                ratings,
+                lambda filters: filters.experience_theme_minimum_ratings(
+                    ratings=ratings
+                ),
+                lead_masks,
+            )
+
+            # Filter: Severe dietary exclusions
+            row &= self._stage_mask(
+                "filter_severe_dietary_exclusions",
+                Experience.DietaryRequirement.OTHER_SEVERE in dietary,
+                lambda filters: filters.filter_severe_dietary_exclusions(
+                    dietary=list(dietary)
+                ),
+            )
+
+            # Filter: experience dietary requirements
+            row &= self._stage_mask(
+                "experiences_dietary_requirements",
+                dietary,
+                lambda filters: filters.experiences_dietary_requirements(
+                    dietary=list(dietary)
+                ),
+                lead_masks,
+            )
+
+            # Filter: no dining experiences for solo travellers
+            row &= self._stage_mask(
+                "dining_experiences_solo_travellers",
+                trip_params.num_travellers == 1,
+                lambda filters: filters.dining_experiences_solo_travellers(
+                    num_travellers=trip_params.num_travellers
+                ),
+            )
+
+            # Filter: pace by percentage of booked time
+            row &= self._stage_mask(
+                "filter_itinerary_pace",
+                trip_params.pace,
+                lambda filters: filters.filter_itinerary_pace(pace=trip_params.pace),
+            )
+
+        # Filter: explicitly excluded locations
+        # Looked up for every lead at once, in a leads x locations exclusion table
+        vocabulary = self.catalog.location_vocabulary
+        excluded = np.zeros((len(trip_params_list), len(vocabulary)), dtype=np.bool_)
+        for lead, trip_params in enumerate(trip_params_list):
+            for location in map(fold_location, trip_params.location_exclusions):
+                if location in vocabulary:
+                    excluded[lead, vocabulary[location]] = True
+
+        if excluded.any():
+            routes, route_positions = self._routes()
+            excluded_routes = excluded[:, routes].any(axis=2)
+            matrix &= ~np.take(excluded_routes, route_positions, axis=1)
+
+        return matrix
+
+    def run(
+        self, trip_params_list: Sequence[TripParameters]
+    ) -> List[List[ItineraryData]]:
+        """
+        Run the ItineraryFilters filters for every lead
+        """
+        itineraries = [
+            [self.catalog.itineraries[int(i)] for i in np.flatnonzero(row)]
+            for row in self.match_matrix(trip_params_list)
+        ]
+
+        return itineraries
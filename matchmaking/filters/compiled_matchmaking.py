@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from matchmaking.filters.experience_types import (
+    DINING_EXPERIENCE_TYPE_NAMES,
+    FOOD_EXPERIENCE_TYPE_NAMES,
+)
+from matchmaking.filters.locations import fold_location, shell_locations
+from matchmaking.filters.pace import DAY_MINUTES, PACE_BOOKED_TIME_LIMITS
+from matchmaking.models import Experience, ExperienceThemes, ItineraryData, MonthMask
+from matchmaking.tm_form import TripParameters
+
+if TYPE_CHECKING:
+    from matchmaking.tm_form import TmFormRatings
+
+# Bit (month - 1) is set when every experience of an itinerary runs in that month
+ALL_MONTHS_MASK = (1 << 12) - 1
+
+# Column of each theme in the compiled minimum ratings
+THEME_COLUMNS = {theme: column for column, theme in enumerate(ExperienceThemes.values)}
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+
+class FlagVocabulary:
+    """
+    Assigns a bit to every flag value seen in a catalog.
+
+    The model choices always take the first bits, any other values found in the
+    data are appended after them so that no flag is ever dropped.
+    """
+
+    def __init__(self, choices: Iterable[str]) -> None:
+        self.bits: Dict[str, int] = {}
+
+        for choice in choices:
+            self.add(choice)
+
+    def add(self, value: str) -> int:
+        if value not in self.bits:
+            self.bits[value] = len(self.bits)
+
+        return self.bits[value]
+
+    @property
+    def words(self) -> int:
+        return max(1, -(-len(self.bits) // _WORD_BITS))
+
+    def mask(self, values: Iterable[str]) -> int:
+        """Mask of the given values, ignoring any value not in the vocabulary"""
+        mask = 0
+
+        for value in values:
+            if value in self.bits:
+                mask |= 1 << self.bits[value]
+
+        return mask
+
+    def to_words(self, mask: int) -> npt.NDArray[np.uint64]:
+        return np.array(
+            [(mask >> (word * _WORD_BITS)) & _WORD_MASK for word in range(self.words)],
+            dtype=np.uint64,
+        )
+
+
+class CompiledCatalog:
+    """
+    Columnar form of a list of ItineraryData.
+
+    Everything the in-memory filters look at is flattened into one NumPy array
+    per attribute, indexed by the position of the itinerary in the catalog.
+    """
+
+    def __init__(
+        self,
+        itineraries: Sequence[ItineraryData],
+        experience_counts: npt.NDArray[np.int32],
+        month_masks: npt.NDArray[np.uint16],
+        fears_vocabulary: FlagVocabulary,
+        fear_masks: npt.NDArray[np.uint64],
+        dietary_vocabulary: FlagVocabulary,
+        dietary_masks: npt.NDArray[np.uint64],
+        has_food_experience: npt.NDArray[np.bool_],
+        has_dining_experience: npt.NDArray[np.bool_],
+        theme_minimum_ratings: npt.NDArray[np.int16],
+        experience_durations: npt.NDArray[np.int64],
+        transport_durations: npt.NDArray[np.int64],
+        shell_lengths: npt.NDArray[np.int64],
+        location_vocabulary: Dict[str, int],
+        location_ids: npt.NDArray[np.int32],
+    ) -> None:
+        self.itineraries = itineraries
+        self.experience_counts = experience_counts
+        self.month_masks = month_masks
+        self.fears_vocabulary = fears_vocabulary
+        self.fear_masks = fear_masks
+        self.dietary_vocabulary = dietary_vocabulary
+        self.dietary_masks = dietary_masks
+        self.has_food_experience = has_food_experience
+        self.has_dining_experience = has_dining_experience
+        # Highest minimum rating of each theme over an itinerary's experiences,
+        # 0 when none has one. One row per theme, in THEME_COLUMNS order, as
+        # comparing whole rows is much faster than across short ones
+        self.theme_minimum_ratings = theme_minimum_ratings
+        self.experience_durations = experience_durations
+        self.transport_durations = transport_durations
+        self.shell_lengths = shell_lengths
+        self.location_vocabulary = location_vocabulary
+        self.location_ids = location_ids
+        self._booked_time_percentages: Optional[npt.NDArray[np.float64]] = None
+
+    def __len__(self) -> int:
+        return len(self.itineraries)
+
+    @classmethod
+    def compile(cls, itineraries: Sequence[ItineraryData]) -> CompiledCatalog:
+        size = len(itineraries)
+
+        fears_vocabulary = FlagVocabulary(Experience.FearPhobiasMedical.values)
+        dietary_vocabulary = FlagVocabulary(Experience.DietaryRequirement.values)
+        location_vocabulary: Dict[str, int] = {}
+
+        experience_counts = np.empty(size, dtype=np.int32)
+        month_masks = np.empty(size, dtype=np.uint16)
+        has_food_experience = np.empty(size, dtype=np.bool_)
+        has_dining_experience = np.empty(size, dtype=np.bool_)
+        theme_minimum_ratings = np.zeros((len(THEME_COLUMNS), size), dtype=np.int16)
+        experience_durations = np.empty(size, dtype=np.int64)
+        transport_durations = np.empty(size, dtype=np.int64)
+        shell_lengths = np.empty(size, dtype=np.int64)
+        location_ids = np.empty((size, 6), dtype=np.int32)
+        fear_masks: List[int] = []
+        dietary_masks: List[int] = []
+
+        for position, itinerary in enumerate(itineraries):
+            month_mask = ALL_MONTHS_MASK
+            fear_mask = 0
+            dietary_mask = 0
+            has_food = False
+            has_dining = False
+            duration = 0
+
+            for experience in itinerary.experiences:
+                month_mask &= MonthMask.from_months(experience.months)
+
+                for fear in experience.fears_phobias_medical:
+                    fear_mask |= 1 << fears_vocabulary.add(fear)
+
+                for dietary in experience.unsuitable_for_dietary_requirement:
+                    dietary_mask |= 1 << dietary_vocabulary.add(dietary)
+
+                for experience_type in experience.experience_types:
+                    has_food = has_food or (
+                        experience_type.name in FOOD_EXPERIENCE_TYPE_NAMES
+                    )
+                    has_dining = has_dining or (
+                        experience_type.name in DINING_EXPERIENCE_TYPE_NAMES
+                    )
+
+                for minimum_rating in experience.theme_minimum_ratings:
+                    # Themes the lead can't rate are never compared, like the ORM
+                    column = THEME_COLUMNS.get(minimum_rating.theme)
+                    if column is not None:
+                        theme_minimum_ratings[column, position] = max(
+                            theme_minimum_ratings[column, position],
+                            minimum_rating.rating,
+                        )
+
+                duration += experience.duration_minutes
+
+            shell = itinerary.shell
+            for column, location in enumerate(shell_locations(shell)):
+                location_ids[position, column] = location_vocabulary.setdefault(
+                    fold_location(location), len(location_vocabulary)
+                )
+
+            experience_counts[position] = len(itinerary.experiences)
+            month_masks[position] = month_mask
+            fear_masks.append(fear_mask)
+            dietary_masks.append(dietary_mask)
+            has_food_experience[position] = has_food
+            has_dining_experience[position] = has_dining
+            experience_durations[position] = duration
+            transport_durations[position] = shell.transport_duration_minutes
+            shell_lengths[position] = shell.length
+
+        return cls(
+            itineraries=itineraries,
+            experience_counts=experience_counts,
+            month_masks=month_masks,
+            fears_vocabulary=fears_vocabulary,
+            fear_masks=_stack_masks(fear_masks, fears_vocabulary),
+            dietary_vocabulary=dietary_vocabulary,
+            dietary_masks=_stack_masks(dietary_masks, dietary_vocabulary),
+            has_food_experience=has_food_experience,
+            has_dining_experience=has_dining_experience,
+            theme_minimum_ratings=theme_minimum_ratings,
+            experience_durations=experience_durations,
+            transport_durations=transport_durations,
+            shell_lengths=shell_lengths,
+            location_vocabulary=location_vocabulary,
+            location_ids=location_ids,
+        )
+
+    def booked_time_percentages(self) -> npt.NDArray[np.float64]:
+        """
+        Percentage of each itinerary's trip that's booked, computed once per
+        catalog. The array is shared, so it mustn't be modified.
+        """
+        if self._booked_time_percentages is not None:
+            return self._booked_time_percentages
+
+        total_booked_time = self.experience_durations + self.transport_durations
+        available_time = DAY_MINUTES * self.shell_lengths
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentages = np.true_divide(
+                total_booked_time, available_time, dtype=np.float64
+            )
+
+        percentages *= 100
+        # Like booked_time_percentage, a shell without any days is fully booked,
+        # including when nothing is booked at all instead of 0/0 = NaN
+        percentages[self.shell_lengths <= 0] = np.inf
+        self._booked_time_percentages = percentages
+
+        return percentages
+
+
+def _stack_masks(
+    masks: List[int], vocabulary: FlagVocabulary
+) -> npt.NDArray[np.uint64]:
+    stacked = np.zeros((len(masks), vocabulary.words), dtype=np.uint64)
+
+    for position, mask in enumerate(masks):
+        if mask:
+            stacked[position] = vocabulary.to_words(mask)
+
+    return stacked
+
+
+class CompiledItineraryFilters:
+    """
+    Vectorised equivalent of InMemoryItineraryFilters.
+
+    Each filter narrows a boolean mask over the compiled catalog instead of
+    rebuilding a list of itineraries, the survivors are only materialised at
+    the end.
+    """
+
+    def __init__(self, catalog: CompiledCatalog) -> None:
+        self.catalog = catalog
+        self.mask = np.ones(len(catalog), dtype=np.bool_)
+
+    @property
+    def itineraries(self) -> List[ItineraryData]:
+        return [self.catalog.itineraries[int(i)] for i in np.flatnonzero(self.mask)]
+
+    def experience_months(self, main_month_int: int) -> None:
+        if not 1 <= main_month_int <= 12:
+            # No experience can run in this month, so only empty itineraries pass
+            self.mask &= self.catalog.experience_counts == 0
+            return
+
+        month_bit = np.uint16(1 << (main_month_int - 1))
+
+        self.mask &= (self.catalog.month_masks & month_bit) != 0
+
+    def experience_fears_phobias_medical(
+        self, fears_phobias_medical: List[str]
+    ) -> None:
+        vocabulary = self.catalog.fears_vocabulary
+        fears_mask = vocabulary.mask(fears_phobias_medical)
+
+        if not fears_mask:
+            return
+
+        overlap = self.catalog.fear_masks & vocabulary.to_words(fears_mask)
+
+        self.mask &= ~overlap.any(axis=1)
+
+    def experience_theme_minimum_ratings(self, ratings: TmFormRatings) -> None:
+        for theme in ExperienceThemes:
+            minimum_ratings = self.catalog.theme_minimum_ratings[
+                THEME_COLUMNS[theme.value]
+            ]
+
+            self.mask &= minimum_ratings <= ratings[theme.name.lower()]
+
+    def experiences_dietary_requirements(self, dietary: List[str]) -> None:
+        vocabulary = self.catalog.dietary_vocabulary
+        dietary_mask = vocabulary.mask(dietary)
+
+        if not dietary_mask:
+            return
+
+        overlap = self.catalog.dietary_masks & vocabulary.to_words(dietary_mask)
+
+        self.mask &= ~overlap.any(axis=1)
+
+    def filter_severe_dietary_exclusions(self, dietary: list[str]) -> None:
+        if Experience.DietaryRequirement.OTHER_SEVERE not in dietary:
+            # If the severe dietary restriction isn't present, no need to exclude any itineraries.
+            return
+
+        self.mask &= ~self.catalog.has_food_experience
+
+    def dining_experiences_solo_travellers(self, num_travellers: int) -> None:
+        if num_travellers != 1:
+            return
+
+        self.mask &= ~self.catalog.has_dining_experience
+
+    def filter_itinerary_pace(self, pace: int) -> None:
+        if pace not in PACE_BOOKED_TIME_LIMITS:
+            self.mask[:] = False
+            return
+
+        lookup, limit = PACE_BOOKED_TIME_LIMITS[pace]
+        percentages = self.catalog.booked_time_percentages()
+
+        if lookup == "lt":
+            self.mask &= percentages < limit
+        else:
+            self.mask &= percentages > limit
+
+    def filter_location_exclusions(self, location_exclusions: list[str]) -> None:
+        vocabulary = self.catalog.location_vocabulary
+        folded_exclusions = map(fold_location, location_exclusions)
+        excluded_ids = [
+            vocabulary[location]
+            for location in folded_exclusions
+            if location in vocabulary
+        ]
+
+        if not excluded_ids:
+            return
+
+        excluded = np.isin(self.catalog.location_ids, excluded_ids).any(axis=1)
+
+        self.mask &= ~excluded
+
+    def run(self, trip_params: TripParameters) -> List[ItineraryData]:
+        """
+        Run the default set of matchmaking Itinerary filters
+        """
+
+        # Filter: experience months
+        self.experience_months(
+            main_month_int=trip_params.main_month_int,
+        )
+
+        # Filter: pace by percentage of booked time
+        self.filter_itinerary_pace(
+            pace=trip_params.pace,
+        )
+
+        # Filter: Severe dietary exclusions
+        self.filter_severe_dietary_exclusions(dietary=trip_params.dietary)
+
+        # Filter: explicitly excluded locations
+        self.filter_location_exclusions(
+            location_exclusions=trip_params.location_exclusions,
+        )
+
+        itineraries = self.itineraries
+
+        return itineraries
+
+    @classmethod
+    def iter_run(
+        cls,
+        itineraries: Iterable[ItineraryData],
+        trip_params: TripParameters,
+        batch_size: int = 10_000,
+    ) -> Iterator[ItineraryData]:
+        """
+        Run the default filters over a stream of itineraries, compiling one batch
+        at a time so that only batch_size itineraries are ever held in memory
+        """
+        iterator = iter(itineraries)
+
+        while batch := list(islice(iterator, batch_size)):
+            catalog = CompiledCatalog.compile(batch)
+
+            yield from cls(catalog=catalog).run(trip_params)
@@ -1,10 +1,44 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
-from django.db.models import Q, QuerySet, Sum
-
-from matchmaking.models import ExperienceThemes, Itinerary, Experience
+import math
+from typing import TYPE_CHECKING, List, Optional
+
+from asgiref.sync import sync_to_async
+
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Lower
+
+from matchmaking.filters.experience_types import (
+    DINING_EXPERIENCE_TYPE_NAMES,
+    FOOD_EXPERIENCE_TYPE_NAMES,
+)
+from matchmaking.filters.instrumentation import (
+    Instrumentation,
+    MatchmakingReport,
+    instrumented_stage,
+)
+from matchmaking.filters.pace import DAY_MINUTES, PACE_BOOKED_TIME_LIMITS
+from matchmaking.models import (
+    City,
+    Country,
+    Experience,
+    ExperienceThemeMinimumRatings,
+    ExperienceThemes,
+    ExperienceType,
+    Itinerary,
+)
 
 if TYPE_CHECKING:
     from matchmaking.tm_form import TmFormRatings, TripParameters
@@ -14,138 +48,165 @@ if TYPE_CHECKING:
 
 
 class ItineraryFilters:
-    def __init__(self, qs: QuerySet[Itinerary]) -> None:
+    def __init__(
+        self,
+        qs: QuerySet[Itinerary],
+        instrumentation: Optional[Instrumentation] = None,
+    ) -> None:
         self.qs = qs
+        self.instrumentation = instrumentation
 
-    def _run_filter(self, query: Q) -> None:
-        self.qs = self.qs.filter(query)
+    @property
+    def report(self) -> Optional[MatchmakingReport]:
+        return self.instrumentation.report if self.instrumentation else None
 
-    def experience_months(self, main_month_int: int) -> None:
-        itinerary_ids = []
+    @property
+    def database(self) -> Optional[str]:
+        return self.qs.db
 
-        for itinerary in self.qs:
-            all_experiences_in_month = True
+    def result_count(self) -> int:
+        return self.qs.count()
 
-            for experience in itinerary.experiences.all():
-                if main_month_int not in experience.months:
-                    all_experiences_in_month = False
+    def _run_filter(self, query: Q) -> None:
+        self.qs = self.qs.filter(query)
 
-            if all_experiences_in_month:
-                itinerary_ids.append(itinerary.id)
+    @instrumented_stage
+    def experience_months(self, main_month_int: int) -> None:
+        # Any experience of the itinerary that doesn't run in the month rules it out
+        experiences_outside_month = Experience.objects.filter(
+            itinerary=OuterRef("pk")
+        ).exclude(months__contains=[main_month_int])
 
-        self._run_filter(query=Q(id__in=itinerary_ids))
+        self._run_filter(query=~Q(Exists(experiences_outside_month)))
 
+    @instrumented_stage
     def experience_fears_phobias_medical(
         self, fears_phobias_medical: list[str]
     ) -> None:
-        query = ~Q(experiences__fears_phobias_medical__overlap=fears_phobias_medical)
+        if not fears_phobias_medical:
+            return
 
-        self._run_filter(query=query)
+        feared_experiences = Experience.objects.filter(
+            itinerary=OuterRef("pk"),
+            fears_phobias_medical__overlap=fears_phobias_medical,
+        )
 
+        self._run_filter(query=~Q(Exists(feared_experiences)))
+
+    @instrumented_stage
     def experience_theme_minimum_ratings(self, ratings: TmFormRatings) -> None:
-        excluded_itinerary_ids = []
+        # Map each theme to the lead's rating for it, so the comparison runs in SQL
+        form_rating = Case(
+            *[
+                When(theme=theme.value, then=Value(ratings[theme.name.lower()]))
+                for theme in ExperienceThemes
+            ],
+            output_field=FloatField(),
+        )
 
-        for itinerary in self.qs.all():
-            for experience in itinerary.experiences.all():
-                for theme_minimum_rating in experience.theme_minimum_ratings.all():
-                    theme_name = ExperienceThemes(theme_minimum_rating.theme).name
-                    form_rating = ratings[theme_name.lower()]
-                    if form_rating < theme_minimum_rating.rating:
-                        excluded_itinerary_ids.append(itinerary.id)
+        unmet_minimum_ratings = (
+            ExperienceThemeMinimumRatings.objects.filter(
+                experience__itinerary=OuterRef("pk")
+            )
+            .alias(form_rating=form_rating)
+            .filter(rating__gt=F("form_rating"))
+        )
 
-        self._run_filter(query=~Q(id__in=excluded_itinerary_ids))
+        self._run_filter(query=~Q(Exists(unmet_minimum_ratings)))
 
+    @instrumented_stage
     def experiences_dietary_requirements(self, dietary: list[str]) -> None:
-        form_dietary_restrictions = set(dietary)
-
-        excluded_itinerary_ids = set()
+        if not dietary:
+            return
 
-        for itinerary in self.qs.all():
-            for experience in itinerary.experiences.all():
-                if set(experience.unsuitable_for_dietary_requirement).intersection(
-                    form_dietary_restrictions
-                ):
-                    excluded_itinerary_ids.add(itinerary.id)
-                    continue
+        unsuitable_experiences = Experience.objects.filter(
+            itinerary=OuterRef("pk"),
+            unsuitable_for_dietary_requirement__overlap=dietary,
+        )
 
-        self._run_filter(query=~Q(id__in=excluded_itinerary_ids))
+        self._run_filter(query=~Q(Exists(unsuitable_experiences)))
 
+    @instrumented_stage
     def filter_severe_dietary_exclusions(self, dietary: list[str]) -> None:
         if Experience.DietaryRequirement.OTHER_SEVERE not in dietary:
             # If the severe dietary restriction isn't present, no need to exclude any itineraries.
             return
 
-        food_experience_types_names = {"Food tour & tastings", "Dining experience"}
-
-        self._run_filter(
-            query=~Q(
-                experiences__experience_types__name__in=food_experience_types_names
-            )
+        food_experience_types = ExperienceType.objects.filter(
+            experience__itinerary=OuterRef("pk"), name__in=FOOD_EXPERIENCE_TYPE_NAMES
         )
 
+        self._run_filter(query=~Q(Exists(food_experience_types)))
+
+    @instrumented_stage
     def dining_experiences_solo_travellers(self, num_travellers: int) -> None:
-        excluded_itinerary_ids = set()
-
-        if num_travellers == 1:
-            # We filter out ALL dining experiences
-            for itinerary in self.qs.all():
-                for experience in itinerary.experiences.all():
-                    foodie_types = {"Dining experience"}
-                    experience_type_names = set(
-                        experience.experience_types.values_list("name", flat=True)
-                    )
-                    if len(experience_type_names.intersection(foodie_types)) > 0:
-                        excluded_itinerary_ids.add(itinerary.id)
-                        continue
-
-        self._run_filter(query=~Q(id__in=excluded_itinerary_ids))
+        if num_travellers != 1:
+            return
 
+        # We filter out ALL dining experiences
+        dining_experience_types = ExperienceType.objects.filter(
+            experience__itinerary=OuterRef("pk"), name__in=DINING_EXPERIENCE_TYPE_NAMES
+        )
+
+        self._run_filter(query=~Q(Exists(dining_experience_types)))
+
+    @instrumented_stage
     def filter_itinerary_pace(self, pace: int) -> None:
-        suitable_itinerary_ids = []
-        for itinerary in self.qs:
-            total_experience_duration = itinerary.experiences.aggregate(
-                total_experience_duration=Sum("duration_minutes")
-            )["total_experience_duration"]
-
-            total_booked_time = (
-                total_experience_duration + itinerary.shell.transport_duration_minutes
+        if pace not in PACE_BOOKED_TIME_LIMITS:
+            self.qs = self.qs.none()
+            return
+
+        total_experience_duration = (
+            Experience.objects.filter(itinerary=OuterRef("pk"))
+            .values("itinerary")
+            .annotate(total_experience_duration=Sum("duration_minutes"))
+            .values("total_experience_duration")
+        )
+
+        total_booked_time = Coalesce(Subquery(total_experience_duration), 0) + F(
+            "shell__transport_duration_minutes"
+        )
+
+        # Cast first so the database doesn't use integer division. Like
+        # booked_time_percentage, a shell without any days is fully booked,
+        # rather than failing the whole statement with a division by zero.
+        booked_time_percentage = Case(
+            When(shell__length__lte=0, then=Value(math.inf)),
+            default=(
+                Cast(total_booked_time, output_field=FloatField())
+                / (DAY_MINUTES * F("shell__length"))
             )
-            booked_time_percentage = (
-                total_booked_time / (9 * 60 * itinerary.shell.length)
-            ) * 100
-
-            if pace == 1 and booked_time_percentage < 40:
-                suitable_itinerary_ids.append(itinerary.id)
-            elif pace == 2 and booked_time_percentage < 55:
-                suitable_itinerary_ids.append(itinerary.id)
-            elif pace == 3 and booked_time_percentage < 75:
-                suitable_itinerary_ids.append(itinerary.id)
-            elif pace == 4 and booked_time_percentage > 20:
-                suitable_itinerary_ids.append(itinerary.id)
-            elif pace == 5 and booked_time_percentage > 25:
-                suitable_itinerary_ids.append(itinerary.id)
-
-        self._run_filter(query=Q(id__in=suitable_itinerary_ids))
+            * 100,
+            output_field=FloatField(),
+        )
+
+        self.qs = self.qs.alias(booked_time_percentage=booked_time_percentage)
 
+        lookup, limit = PACE_BOOKED_TIME_LIMITS[pace]
+
+        self._run_filter(query=Q(**{f"booked_time_percentage__{lookup}": limit}))
+
+    @instrumented_stage
     def filter_location_exclusions(self, location_exclusions: list[str]) -> None:
+        if not location_exclusions:
+            return
+
         location_exclusions = [loc.lower() for loc in location_exclusions]
 
-        location_exclusions_query = Q()
-
-        # We need to loop over each input string to use iexact in the query
-        for location in location_exclusions:
-            # fmt: off
-            query = (
-                ~Q(shell__destination__primary_city__name__iexact=location)
-                & ~Q(shell__destination__primary_city__country__name__iexact=location)
-                & ~Q(shell__flying_to_city__name__iexact=location)
-                & ~Q(shell__flying_to_city__country__name__iexact=location)
-                & ~Q(shell__flying_back_from_city__name__iexact=location)
-                & ~Q(shell__flying_back_from_city__country__name__iexact=location)
-            )
-            # fmt: on
+        # Cities that are excluded themselves or are in an excluded country,
+        # looked up through the Lower("name") indexes on City and Country
+        excluded_countries = Country.objects.alias(lower_name=Lower("name")).filter(
+            lower_name__in=location_exclusions
+        )
+        excluded_cities = City.objects.alias(lower_name=Lower("name")).filter(
+            Q(lower_name__in=location_exclusions) | Q(country__in=excluded_countries)
+        )
 
-            location_exclusions_query.add(query, Q.AND)
+        query = (
+            ~Q(shell__destination__primary_city__in=excluded_cities)
+            & ~Q(shell__flying_to_city__in=excluded_cities)
+            & ~Q(shell__flying_back_from_city__in=excluded_cities)
+        )
 
         self._run_filter(query=query)
 
@@ -195,3 +256,17 @@ class ItineraryFilters:
         itineraries = self.qs
 
         return itineraries
+
+    async def arun(self, trip_params: TripParameters) -> List[Itinerary]:
+        """
+        Run the default set of matchmaking Itinerary filters and fetch the
+        matching itineraries through the async ORM
+        """
+        if self.instrumentation is None:
+            # The stages only build the query, nothing runs until it's fetched
+            itineraries = self.run(trip_params=trip_params)
+        else:
+            # Instrumented stages count their results as they go
+            itineraries = await sync_to_async(self.run)(trip_params=trip_params)
+
+        return [itinerary async for itinerary in itineraries]
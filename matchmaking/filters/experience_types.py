@@ -0,0 +1,5 @@
+# Experience types excluded for leads with a severe dietary requirement
+FOOD_EXPERIENCE_TYPE_NAMES = frozenset({"Food tour & tastings", "Dining experience"})
+
+# Experience types excluded for solo travellers
+DINING_EXPERIENCE_TYPE_NAMES = frozenset({"Dining experience"})
@@ -1,107 +1,344 @@
-from typing import List
+import asyncio
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import (
+    Callable,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-from matchmaking.models import ItineraryData, Experience
+from matchmaking.filters.experience_types import FOOD_EXPERIENCE_TYPE_NAMES
+from matchmaking.filters.instrumentation import (
+    Instrumentation,
+    MatchmakingReport,
+    instrumented_stage,
+)
+from matchmaking.filters.locations import (
+    LocationIndex,
+    fold_location,
+    shell_locations,
+)
+from matchmaking.filters.memo import StageMemo, bitset_positions, to_bitset
+from matchmaking.filters.pace import experience_duration_limit
+from matchmaking.models import ItineraryData, Experience, ShellData
 from matchmaking.tm_form import TripParameters
 
+ItineraryPredicate = Callable[[ItineraryData], bool]
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+# Results kept by each shell-level check. Enough for the distinct shells of a
+# catalog, while a stream of distinct shells can't grow it without limit.
+SHELL_CHECK_CACHE_SIZE = 4096
+
+
+def per_shell(
+    key: Callable[[ShellData], K],
+    check: Callable[[K], T],
+    maxsize: int = SHELL_CHECK_CACHE_SIZE,
+) -> Callable[[ShellData], T]:
+    """
+    Run a check that only depends on part of the shell once per distinct key,
+    and share the result with every itinerary whose shell has that key.
+
+    Only the keys are kept, never the shells, so that checking a stream of
+    itineraries doesn't keep every shell it sees alive.
+    """
+    cached_check = lru_cache(maxsize=maxsize)(check)
+
+    def checked(shell: ShellData) -> T:
+        return cached_check(key(shell))
+
+    return checked
+
 
 class InMemoryItineraryFilters:
-    def __init__(self, itineraries: List[ItineraryData]):
+    def __init__(
+        self,
+        itineraries: List[ItineraryData],
+        location_index: Optional[LocationIndex] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ):
         self.itineraries = itineraries
+        # Shared across requests when given, otherwise filled in as shells are seen
+        self.location_index = location_index or LocationIndex()
+        self.instrumentation = instrumentation
 
-    def experience_months(self, main_month_int: int) -> None:
-        filtered_itineraries = []
+    @property
+    def report(self) -> Optional[MatchmakingReport]:
+        return self.instrumentation.report if self.instrumentation else None
+
+    @property
+    def database(self) -> Optional[str]:
+        return None
+
+    def result_count(self) -> int:
+        return len(self.itineraries)
+
+    def _run_filter(self, predicate: Optional[ItineraryPredicate]) -> None:
+        if predicate is None:
+            return
+
+        self.itineraries = [
+            itinerary for itinerary in self.itineraries if predicate(itinerary)
+        ]
 
-        for itinerary in self.itineraries:
-            all_experiences_in_month = True
+    @staticmethod
+    def experience_months_predicate(main_month_int: int) -> ItineraryPredicate:
+        def all_experiences_in_month(itinerary: ItineraryData) -> bool:
+            return all(
+                main_month_int in experience.months
+                for experience in itinerary.experiences
+            )
 
-            for experience in itinerary.experiences:
-                if main_month_int not in experience.months:
-                    all_experiences_in_month = False
+        return all_experiences_in_month
 
-            if all_experiences_in_month:
-                filtered_itineraries.append(itinerary)
+    @instrumented_stage
+    def experience_months(self, main_month_int: int) -> None:
+        self._run_filter(self.experience_months_predicate(main_month_int))
 
-        self.itineraries = filtered_itineraries
+    @staticmethod
+    def experience_fears_phobias_medical_predicate(
+        fears_phobias_medical: List[str],
+    ) -> Optional[ItineraryPredicate]:
+        if not fears_phobias_medical:
+            return None
 
-    def experience_fears_phobias_medical(
-        self, fears_phobias_medical: List[str]
-    ) -> None:
         fears_phobias_medical_set = set(fears_phobias_medical)
 
-        self.itineraries = [
-            itinerary
-            for itinerary in self.itineraries
-            if not any(
+        def no_fears_phobias_medical(itinerary: ItineraryData) -> bool:
+            return not any(
                 fears_phobias_medical_set.intersection(experience.fears_phobias_medical)
                 for experience in itinerary.experiences
             )
-        ]
 
-    def filter_severe_dietary_exclusions(self, dietary: list[str]) -> None:
+        return no_fears_phobias_medical
+
+    @instrumented_stage
+    def experience_fears_phobias_medical(
+        self, fears_phobias_medical: List[str]
+    ) -> None:
+        self._run_filter(
+            self.experience_fears_phobias_medical_predicate(fears_phobias_medical)
+        )
+
+    @staticmethod
+    def filter_severe_dietary_exclusions_predicate(
+        dietary: list[str],
+    ) -> Optional[ItineraryPredicate]:
         if Experience.DietaryRequirement.OTHER_SEVERE not in dietary:
             # If the severe dietary restriction isn't present, no need to exclude any itineraries.
-            return
-        food_experience_types_names = {"Food tour & tastings", "Dining experience"}
-        non_food_related_itineraries = []
+            return None
 
-        for itinerary in self.itineraries:
-            if all(
-                experience_type.name not in food_experience_types_names
+        def no_food_experiences(itinerary: ItineraryData) -> bool:
+            return all(
+                experience_type.name not in FOOD_EXPERIENCE_TYPE_NAMES
                 for experience in itinerary.experiences
                 for experience_type in experience.experience_types
-            ):
-                non_food_related_itineraries.append(itinerary)
+            )
 
-        self.itineraries = non_food_related_itineraries
+        return no_food_experiences
 
-    def filter_itinerary_pace(self, pace: int) -> None:
-        suitable_itineraries = []
-        for itinerary in self.itineraries:
+    @instrumented_stage
+    def filter_severe_dietary_exclusions(self, dietary: list[str]) -> None:
+        self._run_filter(self.filter_severe_dietary_exclusions_predicate(dietary))
+
+    @staticmethod
+    def filter_itinerary_pace_predicate(pace: int) -> ItineraryPredicate:
+        # The shell's half of the percentage is resolved once per shell into a
+        # limit on the experience minutes
+        duration_limit = per_shell(
+            lambda shell: (shell.transport_duration_minutes, shell.length),
+            lambda shell_durations: experience_duration_limit(
+                pace=pace,
+                transport_duration_minutes=shell_durations[0],
+                length=shell_durations[1],
+            ),
+        )
+
+        def suitable_pace(itinerary: ItineraryData) -> bool:
             total_experience_duration = sum(
                 [e.duration_minutes for e in itinerary.experiences]
             )
 
-            total_booked_time = (
-                total_experience_duration + itinerary.shell.transport_duration_minutes
-            )
+            lookup, minutes = duration_limit(itinerary.shell)
+
+            if lookup == "lt":
+                return total_experience_duration < minutes
+
+            return total_experience_duration >= minutes
+
+        return suitable_pace
+
+    @instrumented_stage
+    def filter_itinerary_pace(self, pace: int) -> None:
+        self._run_filter(self.filter_itinerary_pace_predicate(pace))
+
+    @staticmethod
+    def filter_location_exclusions_predicate(
+        location_exclusions: list[str],
+        location_index: Optional[LocationIndex] = None,
+    ) -> Optional[ItineraryPredicate]:
+        if not location_exclusions:
+            return None
+
+        location_index = location_index or LocationIndex()
+        excluded_location_ids = set(location_index.resolve(location_exclusions))
+        # Names no shell visited yet, looked up again whenever a new shell is
+        # indexed in case it's the first to visit one
+        unresolved = {
+            folded_location
+            for folded_location in map(fold_location, location_exclusions)
+            if location_index.lookup(folded_location) is None
+        }
+
+        def not_excluded(route: Tuple[str, ...]) -> bool:
+            location_ids = location_index.route_location_ids(route)
+
+            for folded_location in list(unresolved):
+                location_id = location_index.lookup(folded_location)
+                if location_id is not None:
+                    excluded_location_ids.add(location_id)
+                    unresolved.discard(folded_location)
 
-            booked_time_percentage = (
-                total_booked_time / (9 * 60 * itinerary.shell.length)
-            ) * 100
+            return location_ids.isdisjoint(excluded_location_ids)
 
-            if pace == 1 and booked_time_percentage < 40:
-                suitable_itineraries.append(itinerary)
-            elif pace == 2 and booked_time_percentage < 55:
-                suitable_itineraries.append(itinerary)
-            elif pace == 3 and booked_time_percentage < 75:
-                suitable_itineraries.append(itinerary)
-            elif pace == 4 and booked_time_percentage > 20:
-                suitable_itineraries.append(itinerary)
-            elif pace == 5 and booked_time_percentage > 25:
-                suitable_itineraries.append(itinerary)
+        # A verdict stays valid once given, since a name can only be resolved by
+        # indexing a route that visits it
+        shell_is_not_excluded = per_shell(shell_locations, not_excluded)
 
-        self.itineraries = suitable_itineraries
+        def is_not_excluded(itinerary: ItineraryData) -> bool:
+            return shell_is_not_excluded(itinerary.shell)
 
+        return is_not_excluded
+
+    @instrumented_stage
     def filter_location_exclusions(self, location_exclusions: list[str]) -> None:
-        location_exclusions_set = set(loc.lower() for loc in location_exclusions)
-
-        def is_excluded(itinerary) -> bool:
-            relevant_locations = {
-                itinerary.shell.destination.primary_city.name.lower(),
-                itinerary.shell.destination.primary_city.country.name.lower(),
-                itinerary.shell.flying_to_city.name.lower(),
-                itinerary.shell.flying_to_city.country.name.lower(),
-                itinerary.shell.flying_back_from_city.name.lower(),
-                itinerary.shell.flying_back_from_city.country.name.lower(),
-            }
-            return any(
-                location in location_exclusions_set for location in relevant_locations
+        self._run_filter(
+            self.filter_location_exclusions_predicate(
+                location_exclusions, self.location_index
             )
+        )
 
-        self.itineraries = [
-            itinerary for itinerary in self.itineraries if not is_excluded(itinerary)
+    @classmethod
+    def predicate_chain(
+        cls,
+        trip_params: TripParameters,
+        location_index: Optional[LocationIndex] = None,
+    ) -> ItineraryPredicate:
+        """
+        Fuse the default set of filters into a single short-circuiting check.
+
+        Filters that have nothing to exclude for these parameters are dropped, and
+        the rest are ordered cheapest and most selective first: the month check
+        usually rejects on the first experience, location exclusions only look at
+        the shell, and pace has to sum every experience so it runs last.
+        """
+        predicates = [
+            predicate
+            for predicate in (
+                cls.experience_months_predicate(trip_params.main_month_int),
+                cls.filter_location_exclusions_predicate(
+                    trip_params.location_exclusions, location_index
+                ),
+                cls.filter_severe_dietary_exclusions_predicate(trip_params.dietary),
+                cls.filter_itinerary_pace_predicate(trip_params.pace),
+            )
+            if predicate is not None
         ]
 
+        def matches(itinerary: ItineraryData) -> bool:
+            for predicate in predicates:
+                if not predicate(itinerary):
+                    return False
+            return True
+
+        return matches
+
+    def run_fused(self, trip_params: TripParameters) -> List[ItineraryData]:
+        """
+        Run the same filters as `run`, but in a single pass over the itineraries
+        """
+        self._run_filter(self.predicate_chain(trip_params, self.location_index))
+
+        itineraries = self.itineraries
+
+        return itineraries
+
+    @classmethod
+    def iter_run(
+        cls,
+        itineraries: Iterable[ItineraryData],
+        trip_params: TripParameters,
+        location_index: Optional[LocationIndex] = None,
+    ) -> Iterator[ItineraryData]:
+        """
+        Lazily run the default filters over a stream of itineraries, such as the
+        generated second tier, yielding each one that survives as soon as it's seen
+        """
+        predicate = cls.predicate_chain(trip_params, location_index)
+
+        for itinerary in itineraries:
+            if predicate(itinerary):
+                yield itinerary
+
+    def run_memoized(
+        self, trip_params: TripParameters, memo: StageMemo[int]
+    ) -> List[ItineraryData]:
+        """
+        Run the same filters as `run`, memoising each low cardinality stage as a
+        bitset over these itineraries so that repeat runs only intersect them.
+
+        The memo must only ever be used with this same list of itineraries.
+        Location exclusions are too varied to be worth memoising, and only run
+        over the itineraries that are left.
+        """
+        catalog = self.itineraries
+
+        def candidates(
+            stage: str, argument: Hashable, predicate: ItineraryPredicate
+        ) -> int:
+            return memo.get_or_compute(
+                stage,
+                argument,
+                lambda: to_bitset(predicate(itinerary) for itinerary in catalog),
+            )
+
+        bitset = candidates(
+            "experience_months",
+            trip_params.main_month_int,
+            self.experience_months_predicate(trip_params.main_month_int),
+        )
+        bitset &= candidates(
+            "filter_itinerary_pace",
+            trip_params.pace,
+            self.filter_itinerary_pace_predicate(trip_params.pace),
+        )
+
+        no_food_experiences = self.filter_severe_dietary_exclusions_predicate(
+            trip_params.dietary
+        )
+        if no_food_experiences is not None:
+            bitset &= candidates(
+                "filter_severe_dietary_exclusions", True, no_food_experiences
+            )
+
+        self.itineraries = [catalog[position] for position in bitset_positions(bitset)]
+
+        self.filter_location_exclusions(
+            location_exclusions=trip_params.location_exclusions,
+        )
+
+        itineraries = self.itineraries
+
+        return itineraries
+
     def run(self, trip_params: TripParameters) -> List[ItineraryData]:
         """
         Run the default set of matchmaking Itinerary filters
@@ -128,3 +365,16 @@ class InMemoryItineraryFilters:
         itineraries = self.itineraries
 
         return itineraries
+
+    async def arun(
+        self, trip_params: TripParameters, executor: Optional[Executor] = None
+    ) -> List[ItineraryData]:
+        """
+        Run the default set of matchmaking Itinerary filters in an executor, the
+        event loop's default one unless given, so they don't block the loop
+        """
+        loop = asyncio.get_running_loop()
+
+        itineraries = await loop.run_in_executor(executor, self.run, trip_params)
+
+        return itineraries
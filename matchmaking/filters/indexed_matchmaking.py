@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from matchmaking.filters.experience_types import FOOD_EXPERIENCE_TYPE_NAMES
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.locations import fold_location, shell_locations
+from matchmaking.models import Experience, ItineraryData
+from matchmaking.tm_form import TripParameters
+
+
+class ItineraryIndex:
+    """
+    Inverted indexes from filter values to the positions of the itineraries in
+    the catalog that they apply to.
+    """
+
+    def __init__(self, itineraries: Sequence[ItineraryData]) -> None:
+        self.itineraries = itineraries
+
+        # Itineraries where every experience runs in the month
+        self.month_ids: Dict[int, Set[int]] = {month: set() for month in range(1, 13)}
+        # Itineraries without experiences, which are available in any month
+        self.without_experiences_ids: Set[int] = set()
+        # Itineraries where any experience has the fear, phobia or condition
+        self.fear_ids: Dict[str, Set[int]] = {}
+        # Itineraries where any experience has the experience type
+        self.experience_type_ids: Dict[str, Set[int]] = {}
+        # Itineraries whose shell visits the city or country, by folded name
+        self.location_ids: Dict[str, Set[int]] = {}
+
+        for position, itinerary in enumerate(itineraries):
+            self._add(position, itinerary)
+
+    def __len__(self) -> int:
+        return len(self.itineraries)
+
+    def _add(self, position: int, itinerary: ItineraryData) -> None:
+        if not itinerary.experiences:
+            self.without_experiences_ids.add(position)
+
+        months: Optional[Set[int]] = None
+
+        for experience in itinerary.experiences:
+            if months is None:
+                months = set(experience.months)
+            else:
+                months.intersection_update(experience.months)
+
+            for fear in experience.fears_phobias_medical:
+                self.fear_ids.setdefault(fear, set()).add(position)
+
+            for experience_type in experience.experience_types:
+                self.experience_type_ids.setdefault(experience_type.name, set()).add(
+                    position
+                )
+
+        for month in months or ():
+            self.month_ids.setdefault(month, set()).add(position)
+
+        for location in shell_locations(itinerary.shell):
+            self.location_ids.setdefault(fold_location(location), set()).add(position)
+
+    @staticmethod
+    def union(index: Dict[str, Set[int]], keys: Iterable[str]) -> Set[int]:
+        ids: Set[int] = set()
+
+        for key in keys:
+            ids |= index.get(key, set())
+
+        return ids
+
+
+class IndexedItineraryFilters:
+    """
+    Equivalent of InMemoryItineraryFilters that narrows a set of catalog positions
+    with index lookups, rather than scanning every itinerary for each filter.
+    """
+
+    def __init__(self, index: ItineraryIndex) -> None:
+        self.index = index
+        # None stands for the whole catalog, so it's never built unless needed
+        self.ids: Optional[Set[int]] = None
+
+    @property
+    def itineraries(self) -> List[ItineraryData]:
+        ids = range(len(self.index)) if self.ids is None else sorted(self.ids)
+
+        return [self.index.itineraries[i] for i in ids]
+
+    def _keep(self, ids: Set[int]) -> None:
+        self.ids = set(ids) if self.ids is None else self.ids & ids
+
+    def _exclude(self, ids: Set[int]) -> None:
+        if not ids:
+            return
+
+        if self.ids is None:
+            self.ids = set(range(len(self.index)))
+
+        self.ids -= ids
+
+    def experience_months(self, main_month_int: int) -> None:
+        self._keep(
+            self.index.month_ids.get(main_month_int, set())
+            | self.index.without_experiences_ids
+        )
+
+    def experience_fears_phobias_medical(
+        self, fears_phobias_medical: List[str]
+    ) -> None:
+        self._exclude(self.index.union(self.index.fear_ids, fears_phobias_medical))
+
+    def filter_severe_dietary_exclusions(self, dietary: list[str]) -> None:
+        if Experience.DietaryRequirement.OTHER_SEVERE not in dietary:
+            # If the severe dietary restriction isn't present, no need to exclude any itineraries.
+            return
+
+        self._exclude(
+            self.index.union(self.index.experience_type_ids, FOOD_EXPERIENCE_TYPE_NAMES)
+        )
+
+    def filter_itinerary_pace(self, pace: int) -> None:
+        # Pace depends on the sum of durations, so it can't be looked up and only
+        # checks the itineraries that are left
+        suitable_pace = InMemoryItineraryFilters.filter_itinerary_pace_predicate(pace)
+        itineraries = self.index.itineraries
+        ids = range(len(self.index)) if self.ids is None else self.ids
+
+        self.ids = {i for i in ids if suitable_pace(itineraries[i])}
+
+    def filter_location_exclusions(self, location_exclusions: list[str]) -> None:
+        self._exclude(
+            self.index.union(
+                self.index.location_ids,
+                map(fold_location, location_exclusions),
+            )
+        )
+
+    def run(self, trip_params: TripParameters) -> List[ItineraryData]:
+        """
+        Run the default set of matchmaking Itinerary filters
+        """
+
+        # Filter: experience months
+        self.experience_months(
+            main_month_int=trip_params.main_month_int,
+        )
+
+        # Filter: Severe dietary exclusions
+        self.filter_severe_dietary_exclusions(dietary=trip_params.dietary)
+
+        # Filter: explicitly excluded locations
+        self.filter_location_exclusions(
+            location_exclusions=trip_params.location_exclusions,
+        )
+
+        # Filter: pace by percentage of booked time, last as it isn't indexed
+        self.filter_itinerary_pace(
+            pace=trip_params.pace,
+        )
+
+        itineraries = self.itineraries
+
+        return itineraries
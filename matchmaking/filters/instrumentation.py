@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import functools
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Concatenate,
+    Dict,
+    List,
+    Optional,
+    ParamSpec,
+    Protocol,
+    TypeVar,
+)
+
+from django.db import connections
+
+P = ParamSpec("P")
+
+
+@dataclass
+class StageReport:
+    stage: str
+    seconds: float
+    input_count: int
+    output_count: int
+    # Only for the ORM filters, zero otherwise
+    queries: int = 0
+    query_seconds: float = 0.0
+
+
+@dataclass
+class MatchmakingReport:
+    stages: List[StageReport] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return sum(stage.seconds for stage in self.stages)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": self.seconds,
+            "stages": [asdict(stage) for stage in self.stages],
+        }
+
+
+StageHook = Callable[[StageReport], None]
+
+
+class Instrumentation:
+    """
+    Collects a StageReport for every filter stage run, into report, and passes
+    each to hook as it's made, e.g. to forward to a metrics system.
+    """
+
+    def __init__(self, hook: Optional[StageHook] = None) -> None:
+        self.hook = hook
+        self.report = MatchmakingReport()
+        # The filters last reported on and their result count, so a run's next
+        # stage doesn't count its input again
+        self._last_count: Optional[tuple[object, int]] = None
+
+    def input_count(self, filters: InstrumentedFilters) -> int:
+        if self._last_count is not None and self._last_count[0] is filters:
+            return self._last_count[1]
+
+        return filters.result_count()
+
+    def record(self, filters: InstrumentedFilters, stage_report: StageReport) -> None:
+        self.report.stages.append(stage_report)
+        self._last_count = (filters, stage_report.output_count)
+
+        if self.hook is not None:
+            self.hook(stage_report)
+
+
+class _QueryTimer:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(
+        self,
+        execute: Callable[..., Any],
+        sql: str,
+        params: Any,
+        many: bool,
+        context: Dict[str, Any],
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - start
+
+
+class InstrumentedFilters(Protocol):
+    instrumentation: Optional[Instrumentation]
+
+    def result_count(self) -> int:
+        ...
+
+    @property
+    def database(self) -> Optional[str]:
+        ...
+
+
+Filters = TypeVar("Filters", bound=InstrumentedFilters)
+
+
+def instrumented_stage(
+    method: Callable[Concatenate[Filters, P], None]
+) -> Callable[Concatenate[Filters, P], None]:
+    """
+    Report on a filter stage when its filters have instrumentation. Without,
+    the stage is called straight through.
+
+    The ORM stages only add to a lazy query, so when instrumented the results
+    are counted after each one. That count is where the database does the work,
+    and includes the stages before it.
+    """
+
+    @functools.wraps(method)
+    def stage(filters: Filters, *args: P.args, **kwargs: P.kwargs) -> None:
+        instrumentation = filters.instrumentation
+        if instrumentation is None:
+            return method(filters, *args, **kwargs)
+
+        input_count = instrumentation.input_count(filters)
+        query_timer = _QueryTimer()
+
+        with ExitStack() as stack:
+            if filters.database is not None:
+                stack.enter_context(
+                    connections[filters.database].execute_wrapper(query_timer)
+                )
+
+            start = time.perf_counter()
+            method(filters, *args, **kwargs)
+            output_count = filters.result_count()
+            seconds = time.perf_counter() - start
+
+        instrumentation.record(
+            filters,
+            StageReport(
+                stage=method.__name__,
+                seconds=seconds,
+                input_count=input_count,
+                output_count=output_count,
+                queries=query_timer.queries,
+                query_seconds=query_timer.seconds,
+            ),
+        )
+
+    return stage
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from matchmaking.models import ItineraryData, ShellData
+
+
+def fold_location(name: str) -> str:
+    """
+    Case and accent insensitive form of a location name, e.g. "Zürich" -> "zurich"
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+
+    return "".join(
+        character for character in decomposed if not unicodedata.combining(character)
+    )
+
+
+def shell_locations(shell: ShellData) -> Tuple[str, ...]:
+    """
+    Every city and country a shell visits, as matched by location exclusions
+    """
+    return (
+        shell.destination.primary_city.name,
+        shell.destination.primary_city.country.name,
+        shell.flying_to_city.name,
+        shell.flying_to_city.country.name,
+        shell.flying_back_from_city.name,
+        shell.flying_back_from_city.country.name,
+    )
+
+
+class LocationIndex:
+    """
+    Resolves locations to integer ids once, so that location exclusions are an
+    intersection of small integer sets rather than string comparisons.
+
+    Location names and the lead's exclusions both go through the same alias table
+    of folded names, so matching ignores case and accents. Only the names of
+    indexed shells and aliases are ever added, never the lead's exclusions, so
+    an index can be shared across requests without growing with them.
+    """
+
+    def __init__(self) -> None:
+        self.aliases: Dict[str, int] = {}
+        # Keyed on the names a shell visits rather than the shell, so that no
+        # shell is kept alive and shells on the same route share one entry
+        self._route_location_ids: Dict[Tuple[str, ...], FrozenSet[int]] = {}
+
+    @classmethod
+    def build(cls, itineraries: Iterable[ItineraryData]) -> LocationIndex:
+        location_index = cls()
+
+        for itinerary in itineraries:
+            location_index.location_ids(itinerary.shell)
+
+        return location_index
+
+    def add_alias(self, alias: str, location: str) -> None:
+        """
+        Make alias resolve to the same id as location, e.g. "USA" to "United States"
+        """
+        self.aliases[fold_location(alias)] = self._location_id(location)
+
+    def _location_id(self, location: str) -> int:
+        return self.aliases.setdefault(fold_location(location), len(self.aliases))
+
+    def location_ids(self, shell: ShellData) -> FrozenSet[int]:
+        return self.route_location_ids(shell_locations(shell))
+
+    def route_location_ids(self, route: Tuple[str, ...]) -> FrozenSet[int]:
+        """
+        Ids of every location on a route, as given by shell_locations
+        """
+        location_ids = self._route_location_ids.get(route)
+
+        if location_ids is None:
+            location_ids = frozenset(self._location_id(location) for location in route)
+            self._route_location_ids[route] = location_ids
+
+        return location_ids
+
+    def lookup(self, folded_location: str) -> Optional[int]:
+        return self.aliases.get(folded_location)
+
+    def resolve(self, locations: Iterable[str]) -> FrozenSet[int]:
+        """
+        Ids of the given locations. Names that no indexed shell visits have no
+        id and are left out, see lookup for shells indexed later on.
+        """
+        location_ids = map(self.lookup, map(fold_location, locations))
+
+        return frozenset(
+            location_id for location_id in location_ids if location_id is not None
+        )
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Callable, Generic, Hashable, Iterable, List, TypeVar
+
+from matchmaking.cache import ResultCache
+
+T = TypeVar("T")
+
+
+class StageMemo(Generic[T]):
+    """
+    Memoised candidate sets of filter stages, per stage and argument value.
+
+    Only worth using for stages whose arguments take few values, like the month
+    or pace. A memo belongs to one catalog, and when given a version function its
+    entries are dropped whenever that version changes.
+    """
+
+    def __init__(
+        self, version: Callable[[], Hashable] = lambda: None, maxsize: int = 4096
+    ) -> None:
+        self._version = version
+        # The version is part of the key, so stale entries are evicted as they age
+        self._candidates: ResultCache[T] = ResultCache(maxsize=maxsize)
+
+    def get_or_compute(
+        self, stage: str, argument: Hashable, compute: Callable[[], T]
+    ) -> T:
+        return self._candidates.get_or_compute(
+            key=(self._version(), stage, argument), compute=compute
+        )
+
+
+def to_bitset(flags: Iterable[bool]) -> int:
+    """
+    Bitset with bit i set when the i-th flag is true
+    """
+    bits = bytearray()
+    byte = 0
+
+    for position, flag in enumerate(flags):
+        if flag:
+            byte |= 1 << (position % 8)
+        if position % 8 == 7:
+            bits.append(byte)
+            byte = 0
+
+    bits.append(byte)
+
+    return int.from_bytes(bits, "little")
+
+
+def bitset_positions(bitset: int) -> List[int]:
+    """
+    Positions of the bits set in a bitset, in ascending order
+    """
+    binary = bin(bitset)[:1:-1]
+
+    return [position for position, bit in enumerate(binary) if bit == "1"]
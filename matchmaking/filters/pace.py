@@ -0,0 +1,80 @@
+import math
+from typing import Dict, Tuple
+
+# Booked time limits for each pace, as (lookup, percentage) pairs.
+# The lookup names match Django's so the ORM filters can use them directly.
+PACE_BOOKED_TIME_LIMITS: Dict[int, Tuple[str, int]] = {
+    1: ("lt", 40),
+    2: ("lt", 55),
+    3: ("lt", 75),
+    4: ("gt", 20),
+    5: ("gt", 25),
+}
+
+# Bookable minutes in a single day of a trip
+DAY_MINUTES = 9 * 60
+
+
+def booked_time_percentage(
+    total_experience_duration: int, transport_duration_minutes: int, length: int
+) -> float:
+    # A shell without any days has no time left to book
+    if length <= 0:
+        return math.inf
+
+    total_booked_time = total_experience_duration + transport_duration_minutes
+
+    return (total_booked_time / (DAY_MINUTES * length)) * 100
+
+
+def is_suitable_pace(pace: int, percentage: float) -> bool:
+    if pace not in PACE_BOOKED_TIME_LIMITS:
+        return False
+
+    lookup, limit = PACE_BOOKED_TIME_LIMITS[pace]
+
+    if lookup == "lt":
+        return percentage < limit
+
+    return percentage > limit
+
+
+def experience_duration_limit(
+    pace: int, transport_duration_minutes: int, length: int
+) -> Tuple[str, int]:
+    """
+    Resolve is_suitable_pace for one shell into a limit on the total experience
+    duration, so it can be checked for every itinerary on the shell without
+    recomputing the percentage.
+
+    Returns ("lt", minutes) when the total has to be under minutes, or
+    ("gte", minutes) when it has to be at least minutes.
+    """
+    lookup = PACE_BOOKED_TIME_LIMITS[pace][0] if pace in PACE_BOOKED_TIME_LIMITS else ""
+
+    def is_suitable(total_experience_duration: int) -> bool:
+        percentage = booked_time_percentage(
+            total_experience_duration=total_experience_duration,
+            transport_duration_minutes=transport_duration_minutes,
+            length=length,
+        )
+        return is_suitable_pace(pace, percentage)
+
+    # The percentage only grows with the duration, so the answer flips at most
+    # once. By the whole trip's minutes it's at least 100%, past every limit.
+    low, high = 0, DAY_MINUTES * length
+    while low < high:
+        middle = (low + high) // 2
+        if is_suitable(middle) == (lookup == "lt"):
+            low = middle + 1
+        else:
+            high = middle
+
+    if lookup == "lt":
+        return "lt", low
+
+    if lookup == "gt":
+        return "gte", low
+
+    # Unknown paces are never suitable
+    return "lt", 0
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+from multiprocessing.pool import Pool
+from types import TracebackType
+from typing import Dict, List, Optional, Tuple, Type
+
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.locations import LocationIndex
+from matchmaking.models import ItineraryData
+from matchmaking.tm_form import TripParameters
+
+# Catalogs shared with the pool's worker processes, by key. Where processes are
+# forked the workers inherit this as it was when the pool started, so the
+# catalog is never pickled. Otherwise each worker is sent its catalog once, as
+# it starts.
+_catalogs: Dict[int, Tuple[List[ItineraryData], LocationIndex]] = {}
+_catalog_keys = itertools.count()
+
+
+def _share_catalog(
+    key: int, itineraries: List[ItineraryData], location_index: LocationIndex
+) -> None:
+    _catalogs[key] = (itineraries, location_index)
+
+
+def _run_shard(
+    key: int, start: int, stop: int, trip_params: TripParameters
+) -> List[int]:
+    """
+    Positions in the catalog of the shard's itineraries that match
+    """
+    itineraries, location_index = _catalogs[key]
+    matches = InMemoryItineraryFilters.predicate_chain(trip_params, location_index)
+
+    return [
+        position for position in range(start, stop) if matches(itineraries[position])
+    ]
+
+
+class ParallelItineraryFilters:
+    """
+    Runs the InMemoryItineraryFilters filters over shards of a catalog in a pool
+    of processes, with the same results, in the same order, as a serial `run`.
+
+    The pool starts on the first run and is kept for later ones, until `close`.
+    The catalog mustn't change while it's open.
+    """
+
+    def __init__(
+        self,
+        itineraries: List[ItineraryData],
+        processes: Optional[int] = None,
+        shards_per_process: int = 4,
+        location_index: Optional[LocationIndex] = None,
+    ) -> None:
+        self.itineraries = itineraries
+        self.processes = processes or os.cpu_count() or 1
+        self.shards_per_process = shards_per_process
+        # Built before the pool starts, so every worker shares the same one
+        self.location_index = location_index or LocationIndex.build(itineraries)
+        self._key = next(_catalog_keys)
+        self._pool: Optional[Pool] = None
+
+    def __enter__(self) -> ParallelItineraryFilters:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def _start_pool(self) -> Pool:
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Kept until the pool closes, for any worker the pool has to replace
+            _share_catalog(self._key, self.itineraries, self.location_index)
+
+            return multiprocessing.get_context("fork").Pool(self.processes)
+
+        return multiprocessing.get_context().Pool(
+            self.processes,
+            initializer=_share_catalog,
+            initargs=(self._key, self.itineraries, self.location_index),
+        )
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+        _catalogs.pop(self._key, None)
+
+    def shards(self) -> List[Tuple[int, int]]:
+        """
+        Contiguous (start, stop) ranges of positions covering the catalog in order
+        """
+        count = min(len(self.itineraries), self.processes * self.shards_per_process)
+        size = len(self.itineraries)
+
+        return [(i * size // count, (i + 1) * size // count) for i in range(count)]
+
+    def run(self, trip_params: TripParameters) -> List[ItineraryData]:
+        """
+        Run the default set of matchmaking Itinerary filters
+        """
+        if self._pool is None:
+            self._pool = self._start_pool()
+
+        # starmap keeps the shards' order, so the merged positions are ascending
+        shard_positions = self._pool.starmap(
+            _run_shard,
+            [(self._key, start, stop, trip_params) for start, stop in self.shards()],
+        )
+
+        itineraries = [
+            self.itineraries[position]
+            for positions in shard_positions
+            for position in positions
+        ]
+
+        return itineraries
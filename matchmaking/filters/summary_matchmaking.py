@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.db.models import Q
+
+from matchmaking.filters.django_matchmaking import ItineraryFilters
+from matchmaking.filters.instrumentation import instrumented_stage
+from matchmaking.filters.pace import PACE_BOOKED_TIME_LIMITS
+from matchmaking.models import Experience, ExperienceThemes
+
+if TYPE_CHECKING:
+    from matchmaking.tm_form import TmFormRatings
+
+
+class SummaryItineraryFilters(ItineraryFilters):
+    """
+    ItineraryFilters that read each itinerary's ItinerarySummary instead of its
+    experiences, so every stage is a plain WHERE clause on the summary table.
+
+    Itineraries without a summary never match, see rebuild_itinerary_summaries.
+    """
+
+    @instrumented_stage
+    def experience_months(self, main_month_int: int) -> None:
+        self._run_filter(query=Q(summary__months__contains=[main_month_int]))
+
+    @instrumented_stage
+    def experience_fears_phobias_medical(
+        self, fears_phobias_medical: list[str]
+    ) -> None:
+        if not fears_phobias_medical:
+            return
+
+        self._run_filter(
+            query=~Q(summary__fears_phobias_medical__overlap=fears_phobias_medical)
+        )
+
+    @instrumented_stage
+    def experience_theme_minimum_ratings(self, ratings: TmFormRatings) -> None:
+        # Every theme is in the summary, with 0 when nothing has a minimum
+        unmet_minimum_ratings = Q()
+        for theme in ExperienceThemes:
+            unmet_minimum_ratings |= Q(
+                **{
+                    f"summary__theme_minimum_ratings__{theme.value}__gt": ratings[
+                        theme.name.lower()
+                    ]
+                }
+            )
+
+        self._run_filter(query=~unmet_minimum_ratings)
+
+    @instrumented_stage
+    def experiences_dietary_requirements(self, dietary: list[str]) -> None:
+        if not dietary:
+            return
+
+        self._run_filter(
+            query=~Q(summary__unsuitable_for_dietary_requirement__overlap=dietary)
+        )
+
+    @instrumented_stage
+    def filter_severe_dietary_exclusions(self, dietary: list[str]) -> None:
+        if Experience.DietaryRequirement.OTHER_SEVERE not in dietary:
+            # If the severe dietary restriction isn't present, no need to exclude any itineraries.
+            return
+
+        self._run_filter(query=Q(summary__has_food_experience=False))
+
+    @instrumented_stage
+    def dining_experiences_solo_travellers(self, num_travellers: int) -> None:
+        if num_travellers != 1:
+            return
+
+        self._run_filter(query=Q(summary__has_dining_experience=False))
+
+    @instrumented_stage
+    def filter_itinerary_pace(self, pace: int) -> None:
+        if pace not in PACE_BOOKED_TIME_LIMITS:
+            self.qs = self.qs.none()
+            return
+
+        lookup, limit = PACE_BOOKED_TIME_LIMITS[pace]
+
+        self._run_filter(
+            query=Q(**{f"summary__booked_time_percentage__{lookup}": limit})
+        )
+
+    @instrumented_stage
+    def filter_location_exclusions(self, location_exclusions: list[str]) -> None:
+        if not location_exclusions:
+            return
+
+        location_exclusions = [loc.lower() for loc in location_exclusions]
+
+        self._run_filter(
+            query=~Q(summary__location_tokens__overlap=location_exclusions)
+        )
@@ -0,0 +1,142 @@
+import json
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+
+from matchmaking.benchmarks.catalog import (
+    CatalogSpec,
+    build_database_catalog,
+    build_in_memory_catalog,
+    generate_trip_parameters,
+)
+from matchmaking.benchmarks.runner import (
+    Results,
+    benchmark_engine,
+    compare,
+    compiled_engine,
+    in_memory_engine,
+    indexed_engine,
+    orm_engine,
+)
+
+IN_MEMORY_ENGINES = {
+    "in_memory": in_memory_engine,
+    "compiled": compiled_engine,
+    "indexed": indexed_engine,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the matchmaking filters over synthetic catalogs, optionally "
+        "saving the results as a baseline or comparing them against one"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 100_000, 1_000_000],
+            help="Number of itineraries in each catalog",
+        )
+        parser.add_argument(
+            "--engines",
+            nargs="+",
+            choices=[*IN_MEMORY_ENGINES, "orm"],
+            default=list(IN_MEMORY_ENGINES),
+            help=(
+                "Filters to benchmark. orm replaces the matchmaking tables with "
+                "each catalog, so only use it on a scratch Postgres database."
+            ),
+        )
+        parser.add_argument("--trip-parameters", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", type=Path, help="Save the results as JSON")
+        parser.add_argument(
+            "--compare", type=Path, help="Baseline JSON to check for regressions"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Slowdown over the baseline counted as a regression, 0.1 is 10%%",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if "orm" in options["engines"] and connection.vendor != "postgresql":
+            raise CommandError("The orm engine needs a Postgres database")
+
+        trip_params_list = generate_trip_parameters(
+            options["trip_parameters"], seed=options["seed"]
+        )
+        results: Results = {}
+
+        for size in options["sizes"]:
+            spec = CatalogSpec(size=size, seed=options["seed"])
+            engines = []
+
+            in_memory_engines = [
+                name for name in options["engines"] if name in IN_MEMORY_ENGINES
+            ]
+            if in_memory_engines:
+                catalog = build_in_memory_catalog(spec)
+                engines += [
+                    IN_MEMORY_ENGINES[name](catalog) for name in in_memory_engines
+                ]
+
+            if "orm" in options["engines"]:
+                build_database_catalog(spec)
+                engines.append(orm_engine())
+
+            for engine in engines:
+                self.stdout.write(f"Benchmarking {engine.name} with {size} itineraries")
+                engine_results = benchmark_engine(
+                    engine,
+                    trip_params_list=trip_params_list,
+                    catalog_size=size,
+                    repeat=options["repeat"],
+                )
+                self.write_results(engine_results)
+                results.update(engine_results)
+
+        if options["output"]:
+            options["output"].write_text(
+                json.dumps(
+                    {
+                        "created": datetime.now(timezone.utc).isoformat(),
+                        "python": platform.python_version(),
+                        "seed": options["seed"],
+                        "trip_parameters": options["trip_parameters"],
+                        "repeat": options["repeat"],
+                        "results": results,
+                    },
+                    indent=2,
+                )
+            )
+
+        if options["compare"]:
+            baseline = json.loads(options["compare"].read_text())["results"]
+            regressions = compare(baseline, results, threshold=options["threshold"])
+
+            if regressions:
+                raise CommandError(
+                    "Regressions against the baseline:\n"
+                    + "\n".join(str(regression) for regression in regressions)
+                )
+
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def write_results(self, results: Results) -> None:
+        for key, metrics in results.items():
+            self.stdout.write(
+                f"  {key:<60} p50 {metrics['p50_ms']:9.2f}ms "
+                f"p95 {metrics['p95_ms']:9.2f}ms p99 {metrics['p99_ms']:9.2f}ms "
+                f"{metrics['throughput']:12.0f}/s "
+                f"peak {metrics['peak_memory_kb']:10.0f}KB"
+            )
@@ -0,0 +1,65 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+
+from matchmaking.benchmarks.catalog import (
+    CatalogSpec,
+    build_database_catalog,
+    generate_trip_parameters,
+)
+from matchmaking.benchmarks.explain import explain_stages, index_scans
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the Postgres query plan of each matchmaking filter stage, and the "
+        "indexes it scans"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--size",
+            type=int,
+            help=(
+                "Replace the matchmaking tables with a synthetic catalog of this "
+                "many itineraries first. Only use it on a scratch database."
+            ),
+        )
+        parser.add_argument("--trip-parameters", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-analyze",
+            action="store_true",
+            help="Plan the queries without running them",
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="Print the full query plans"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans need a Postgres database")
+
+        if options["size"]:
+            build_database_catalog(
+                CatalogSpec(size=options["size"], seed=options["seed"])
+            )
+
+        # Fresh statistics, so the planner sees the catalog as it is
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        for trip_params in generate_trip_parameters(
+            options["trip_parameters"], seed=options["seed"]
+        ):
+            self.stdout.write(str(trip_params))
+
+            plans = explain_stages(trip_params, analyze=not options["no_analyze"])
+
+            for stage, plan in plans.items():
+                indexes = ", ".join(index_scans(plan)) or "no index scans"
+                self.stdout.write(f"  {stage}: {indexes}")
+
+                if options["plans"]:
+                    self.stdout.write(plan)
@@ -0,0 +1,17 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from matchmaking.benchmarks.memory import bytes_per_itinerary
+
+
+class Command(BaseCommand):
+    help = "Measure the memory each in-memory itinerary takes, with tracemalloc"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--itineraries", type=int, default=20_000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        per_itinerary = bytes_per_itinerary(count=options["itineraries"])
+
+        self.stdout.write(f"{per_itinerary:.0f} bytes per itinerary")
@@ -0,0 +1,23 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from matchmaking.models import Itinerary
+from matchmaking.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update every itinerary's ItinerarySummary, e.g. after "
+        "migrating or a bulk change the signals don't see"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        rebuilt = rebuild_summaries(
+            Itinerary.objects.all(), batch_size=options["batch_size"]
+        )
+
+        self.stdout.write(f"Rebuilt {rebuilt} itinerary summaries")
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-18 16:01
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matchmaking", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="city",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="city_lower_name_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="country",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="country_lower_name_idx",
+            ),
+        ),
+    ]
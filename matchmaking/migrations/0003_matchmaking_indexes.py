@@ -0,0 +1,64 @@
+# Generated by Django 4.2.9 on 2026-10-18 16:01
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matchmaking", "0002_lower_name_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="experiencetype",
+            name="name",
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="experience",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["months"], name="experience_months_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="experience",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["fears_phobias_medical"], name="experience_fears_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="experience",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["unsuitable_for_dietary_requirement"],
+                name="experience_dietary_gin",
+            ),
+        ),
+        # The auto-created through tables are only indexed by their unique
+        # (from, to) constraint and one index per column. These cover joins
+        # in the other direction, e.g. from experience to its itineraries,
+        # without going back to the table.
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX itinerary_experiences_reverse_idx "
+                "ON matchmaking_itinerary_experiences (experience_id, itinerary_id)"
+            ),
+            reverse_sql="DROP INDEX itinerary_experiences_reverse_idx",
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX experience_types_reverse_idx "
+                "ON matchmaking_experience_experience_types "
+                "(experiencetype_id, experience_id)"
+            ),
+            reverse_sql="DROP INDEX experience_types_reverse_idx",
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX experience_theme_minimum_ratings_reverse_idx "
+                "ON matchmaking_experience_theme_minimum_ratings "
+                "(experiencethememinimumratings_id, experience_id)"
+            ),
+            reverse_sql="DROP INDEX experience_theme_minimum_ratings_reverse_idx",
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 4.2.9 on 2026-10-18 16:03
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matchmaking", "0003_matchmaking_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItinerarySummary",
+            fields=[
+                (
+                    "itinerary",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="matchmaking.itinerary",
+                    ),
+                ),
+                (
+                    "months",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.PositiveIntegerField(
+                            choices=[
+                                (1, "January"),
+                                (2, "February"),
+                                (3, "March"),
+                                (4, "April"),
+                                (5, "May"),
+                                (6, "June"),
+                                (7, "July"),
+                                (8, "August"),
+                                (9, "September"),
+                                (10, "October"),
+                                (11, "November"),
+                                (12, "December"),
+                            ]
+                        ),
+                        size=12,
+                    ),
+                ),
+                (
+                    "fears_phobias_medical",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=100), size=None
+                    ),
+                ),
+                (
+                    "unsuitable_for_dietary_requirement",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=20), size=None
+                    ),
+                ),
+                ("has_food_experience", models.BooleanField()),
+                ("has_dining_experience", models.BooleanField()),
+                ("total_experience_minutes", models.PositiveIntegerField()),
+                ("booked_time_percentage", models.FloatField()),
+                (
+                    "location_tokens",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=100), size=None
+                    ),
+                ),
+                ("theme_minimum_ratings", models.JSONField()),
+            ],
+            options={
+                "verbose_name_plural": "Itinerary summaries",
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["months"], name="summary_months_gin"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["fears_phobias_medical"], name="summary_fears_gin"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["unsuitable_for_dietary_requirement"],
+                        name="summary_dietary_gin",
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["location_tokens"], name="summary_locations_gin"
+                    ),
+                    models.Index(
+                        fields=["booked_time_percentage"],
+                        name="summary_booked_time_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
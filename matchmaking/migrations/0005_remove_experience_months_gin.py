@@ -0,0 +1,16 @@
+# Generated by Django 4.2.9 on 2026-10-18 16:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matchmaking", "0004_itinerary_summary"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="experience",
+            name="experience_months_gin",
+        ),
+    ]
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator, List, Optional
 
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import QuerySet
+from django.db.models.functions import Lower
 
 if TYPE_CHECKING:
+    from matchmaking.filters.instrumentation import Instrumentation
+    from matchmaking.models.in_memory_models import ItineraryData
     from matchmaking.tm_form import TripParameters
 
 
@@ -33,6 +37,10 @@ class Country(models.Model):
     # Fields
     name = models.CharField(primary_key=True, max_length=100)
 
+    class Meta:
+        # For case insensitive lookups, e.g. matchmaking location exclusions
+        indexes = [models.Index(Lower("name"), name="country_lower_name_idx")]
+
 
 class City(models.Model):
     # Relationships
@@ -42,6 +50,10 @@ class City(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
 
+    class Meta:
+        # For case insensitive lookups, e.g. matchmaking location exclusions
+        indexes = [models.Index(Lower("name"), name="city_lower_name_idx")]
+
 
 class Destination(models.Model):
     # Relationships
@@ -122,7 +134,7 @@ class ExperienceType(models.Model):
         SPA_TREATMENTS = "Spa treatments with physical contact"
 
     # Fields
-    name = models.CharField(max_length=50)
+    name = models.CharField(max_length=50, db_index=True)
     type = models.CharField(
         choices=FormExperienceExclusions.choices, max_length=50, blank=True
     )
@@ -187,20 +199,176 @@ class Experience(models.Model):
     )
     duration_minutes = models.PositiveIntegerField()
 
+    class Meta:
+        # For the matchmaking filters' __overlap lookups. Months are only ever
+        # matched negated, by "NOT (months @> ...)", which no GIN index serves.
+        indexes = [
+            GinIndex(
+                fields=["fears_phobias_medical"],
+                name="experience_fears_gin",
+            ),
+            GinIndex(
+                fields=["unsuitable_for_dietary_requirement"],
+                name="experience_dietary_gin",
+            ),
+        ]
+
 
 class ItineraryManager(models.Manager["Itinerary"]):
     def after_matchmaking_filters(
-        self, trip_params: TripParameters
+        self,
+        trip_params: TripParameters,
+        use_cache: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        use_summaries: bool = False,
     ) -> QuerySet[Itinerary]:
+        """
+        With use_cache, the matched ids are kept for later runs with equivalent
+        parameters, until anything in the catalog changes. It needs a cache
+        backend shared by every process, and only results of up to
+        MAX_CACHED_RESULT_IDS itineraries are kept.
+
+        With instrumentation, every stage that runs is reported on in its report.
+
+        With use_summaries, the filters read each itinerary's ItinerarySummary
+        instead of its experiences.
+        """
         # This is here to prevent circular imports
+        from matchmaking.cache import (
+            MAX_CACHED_RESULT_IDS,
+            catalog_version,
+            check_shared_cache,
+            matchmaking_results,
+            trip_parameters_key,
+        )
         from matchmaking.filters.django_matchmaking import ItineraryFilters
-
-        filters = ItineraryFilters(qs=self.model.objects.all())
+        from matchmaking.filters.summary_matchmaking import SummaryItineraryFilters
+
+        if use_cache:
+            check_shared_cache()
+            key = (
+                catalog_version(),
+                use_summaries,
+                trip_parameters_key(trip_params),
+            )
+            itinerary_ids = matchmaking_results.get(key)
+
+            if itinerary_ids is not None:
+                return self.model.objects.filter(id__in=itinerary_ids)
+
+            itineraries = self.after_matchmaking_filters(
+                trip_params,
+                instrumentation=instrumentation,
+                use_summaries=use_summaries,
+            )
+            itinerary_ids = tuple(
+                itineraries.values_list("id", flat=True)[: MAX_CACHED_RESULT_IDS + 1]
+            )
+
+            if len(itinerary_ids) <= MAX_CACHED_RESULT_IDS:
+                matchmaking_results.set(key, itinerary_ids)
+
+            return itineraries
+
+        filters_class = SummaryItineraryFilters if use_summaries else ItineraryFilters
+        filters = filters_class(
+            qs=self.model.objects.all(), instrumentation=instrumentation
+        )
 
         itineraries = filters.run(trip_params=trip_params)
 
         return itineraries
 
+    async def aafter_matchmaking_filters(
+        self,
+        trip_params: TripParameters,
+        use_cache: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        use_summaries: bool = False,
+    ) -> List[Itinerary]:
+        """
+        Async counterpart of after_matchmaking_filters, which fetches the
+        matching itineraries without blocking the event loop
+        """
+        # This is here to prevent circular imports
+        from matchmaking.cache import (
+            MAX_CACHED_RESULT_IDS,
+            acatalog_version,
+            check_shared_cache,
+            matchmaking_results,
+            trip_parameters_key,
+        )
+        from matchmaking.filters.django_matchmaking import ItineraryFilters
+        from matchmaking.filters.summary_matchmaking import SummaryItineraryFilters
+
+        if use_cache:
+            check_shared_cache()
+            key = (
+                await acatalog_version(),
+                use_summaries,
+                trip_parameters_key(trip_params),
+            )
+            itinerary_ids = matchmaking_results.get(key)
+
+            if itinerary_ids is None:
+                itineraries = await self.aafter_matchmaking_filters(
+                    trip_params,
+                    instrumentation=instrumentation,
+                    use_summaries=use_summaries,
+                )
+                if len(itineraries) <= MAX_CACHED_RESULT_IDS:
+                    matchmaking_results.set(
+                        key, tuple(itinerary.id for itinerary in itineraries)
+                    )
+
+                return itineraries
+
+            return [
+                itinerary
+                async for itinerary in self.model.objects.filter(id__in=itinerary_ids)
+            ]
+
+        filters_class = SummaryItineraryFilters if use_summaries else ItineraryFilters
+        filters = filters_class(
+            qs=self.model.objects.all(), instrumentation=instrumentation
+        )
+
+        itineraries = await filters.arun(trip_params=trip_params)
+
+        return itineraries
+
+    def snapshot(self) -> List[ItineraryData]:
+        """
+        Load every itinerary into in-memory models, for the in-memory filters
+        """
+        # This is here to prevent circular imports
+        from matchmaking.snapshot import load_itinerary_snapshot
+
+        return load_itinerary_snapshot(self.get_queryset())
+
+    def second_tier_itineraries(
+        self,
+        trip_params: Optional[TripParameters] = None,
+        experiences_per_itinerary: int = 3,
+    ) -> Iterator[ItineraryData]:
+        """
+        Generate the "second tier" of itineraries, which aren't stored in this table.
+
+        Passing trip_params prunes experiences and combinations that the in-memory
+        filters would reject, instead of generating them only to throw them away.
+        """
+        # This is here to prevent circular imports
+        from matchmaking.second_tier import (
+            generate_second_tier_itineraries,
+            load_second_tier_candidates,
+        )
+
+        return generate_second_tier_itineraries(
+            candidates=load_second_tier_candidates(),
+            experiences_per_itinerary=experiences_per_itinerary,
+            trip_params=trip_params,
+        )
+
 
 class Itinerary(models.Model):
     # Relationships
@@ -214,3 +382,51 @@ class Itinerary(models.Model):
 
     # Custom managers
     objects = ItineraryManager()
+
+
+class ItinerarySummary(models.Model):
+    """
+    What the matchmaking filters need to know about an itinerary, derived from
+    its shell and experiences, so every filter is a WHERE clause on this table.
+
+    Kept up to date by matchmaking.signals. Changes that don't send signals,
+    like QuerySet.update() or bulk_create(), need a rebuild_itinerary_summaries.
+    """
+
+    # Relationships
+    itinerary = models.OneToOneField(
+        "matchmaking.Itinerary",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="summary",
+    )
+
+    # Fields
+    # Months every experience runs in, all of them for no experiences
+    months = ArrayField(models.PositiveIntegerField(choices=Month.choices), size=12)
+    # Everything any experience is unsuitable for
+    fears_phobias_medical = ArrayField(models.CharField(max_length=100))
+    unsuitable_for_dietary_requirement = ArrayField(models.CharField(max_length=20))
+    has_food_experience = models.BooleanField()
+    has_dining_experience = models.BooleanField()
+    total_experience_minutes = models.PositiveIntegerField()
+    booked_time_percentage = models.FloatField()
+    # Lower-cased names of every city and country the shell visits
+    location_tokens = ArrayField(models.CharField(max_length=100))
+    # The highest minimum rating of any experience for each theme, 0 for none
+    theme_minimum_ratings = models.JSONField()
+
+    class Meta:
+        verbose_name_plural = "Itinerary summaries"
+        indexes = [
+            GinIndex(fields=["months"], name="summary_months_gin"),
+            GinIndex(fields=["fears_phobias_medical"], name="summary_fears_gin"),
+            GinIndex(
+                fields=["unsuitable_for_dietary_requirement"],
+                name="summary_dietary_gin",
+            ),
+            GinIndex(fields=["location_tokens"], name="summary_locations_gin"),
+            models.Index(
+                fields=["booked_time_percentage"], name="summary_booked_time_idx"
+            ),
+        ]
@@ -1,60 +1,146 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+from __future__ import annotations
 
+import sys
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
-@dataclass
+# These models are held in their millions by in-memory matchmaking, so they are
+# kept compact: slotted and frozen, with tuples instead of lists, months packed
+# into an int, and repeated names interned so every copy shares one string.
+
+
+class MonthMask(int):
+    """
+    A set of months packed into an int, with bit (month - 1) set for each month.
+    Values outside 1 to 12 can't be matched by any lead, so they're left out.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_months(cls, months: Iterable[int]) -> MonthMask:
+        if isinstance(months, MonthMask):
+            return months
+
+        mask = 0
+        for month in months:
+            if 1 <= month <= 12:
+                mask |= 1 << (month - 1)
+
+        if mask < len(_MONTH_MASKS):
+            return _MONTH_MASKS[mask]
+
+        return cls(mask)
+
+    def __contains__(self, month: object) -> bool:
+        return isinstance(month, int) and month >= 1 and bool(self >> (month - 1) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        return (month for month in range(1, self.bit_length() + 1) if month in self)
+
+    def __len__(self) -> int:
+        return bin(self).count("1")
+
+    def __repr__(self) -> str:
+        return f"MonthMask({list(self)})"
+
+
+# Every combination of the twelve months, so equal masks are always one object
+_MONTH_MASKS: List[MonthMask] = [MonthMask(mask) for mask in range(1 << 12)]
+
+
+def _intern_all(values: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sys.intern(value) for value in values)
+
+
+@dataclass(frozen=True, slots=True)
 class CountryData:
     name: str
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CityData:
     country: CountryData
     id: Optional[int] = None
     name: str = ""
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class DestinationData:
     primary_city: CityData
     name: str
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ShellData:
     destination: DestinationData
     flying_to_city: CityData
     flying_back_from_city: CityData
     length: int
     transport_duration_minutes: int
+    id: Optional[int] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ExperienceThemeMinimumRatingsData:
     theme: str
     rating: int
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "theme", sys.intern(self.theme))
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class ExperienceTypeData:
     name: str
     type: str
     affected_by_group_private: bool
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+        object.__setattr__(self, "type", sys.intern(self.type))
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ExperienceData:
-    experience_types: List[ExperienceTypeData] = field(default_factory=list)
-    theme_minimum_ratings: List[ExperienceThemeMinimumRatingsData] = field(
-        default_factory=list
-    )
-    months: List[int] = field(default_factory=list)
-    fears_phobias_medical: List[str] = field(default_factory=list)
-    unsuitable_for_dietary_requirement: List[str] = field(default_factory=list)
+    experience_types: Sequence[ExperienceTypeData] = ()
+    theme_minimum_ratings: Sequence[ExperienceThemeMinimumRatingsData] = ()
+    months: Iterable[int] = MonthMask(0)
+    fears_phobias_medical: Sequence[str] = ()
+    unsuitable_for_dietary_requirement: Sequence[str] = ()
     duration_minutes: int = 0
+    id: Optional[int] = None
 
-
-@dataclass
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "experience_types", tuple(self.experience_types))
+        object.__setattr__(
+            self, "theme_minimum_ratings", tuple(self.theme_minimum_ratings)
+        )
+        object.__setattr__(self, "months", MonthMask.from_months(self.months))
+        object.__setattr__(
+            self, "fears_phobias_medical", _intern_all(self.fears_phobias_medical)
+        )
+        object.__setattr__(
+            self,
+            "unsuitable_for_dietary_requirement",
+            _intern_all(self.unsuitable_for_dietary_requirement),
+        )
+
+
+@dataclass(frozen=True, slots=True)
 class ItineraryData:
     shell: ShellData
-    experiences: List[ExperienceData] = field(default_factory=list)
+    experiences: Sequence[ExperienceData] = ()
+    id: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "experiences", tuple(self.experiences))
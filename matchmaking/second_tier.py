@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.pace import (
+    PACE_BOOKED_TIME_LIMITS,
+    booked_time_percentage,
+    is_suitable_pace,
+)
+from matchmaking.models import (
+    Experience,
+    ExperienceData,
+    Itinerary,
+    ItineraryData,
+    Shell,
+    ShellData,
+)
+from matchmaking.snapshot import load_experiences, load_shells
+
+if TYPE_CHECKING:
+    from matchmaking.tm_form import TripParameters
+
+# The "second tier" of itineraries is every combination of a shell with the
+# experiences that are available alongside it, generated on demand rather than
+# stored in the Itinerary table.
+
+SecondTierCandidates = Tuple[ShellData, List[ExperienceData]]
+
+
+def generate_second_tier_itineraries(
+    candidates: Iterable[SecondTierCandidates],
+    experiences_per_itinerary: int,
+    trip_params: Optional[TripParameters] = None,
+) -> Iterator[ItineraryData]:
+    """
+    Yield every combination of experiences_per_itinerary experiences for each shell.
+
+    With trip_params, the in-memory filters are pushed down into generation:
+    shells are dropped by location exclusions, experiences by month, fears and
+    severe dietary restrictions, and a combination stops growing as soon as it
+    books more time than the pace allows. Every itinerary yielded then already
+    passes those filters.
+    """
+    if trip_params is None:
+        for shell, experiences in candidates:
+            yield from _combinations(shell, experiences, experiences_per_itinerary)
+        return
+
+    is_not_excluded = InMemoryItineraryFilters.filter_location_exclusions_predicate(
+        trip_params.location_exclusions
+    )
+    # These filters require every experience of an itinerary to pass, so checking
+    # each experience on its own gives exactly the same result
+    experience_predicates = [
+        predicate
+        for predicate in (
+            InMemoryItineraryFilters.experience_months_predicate(
+                trip_params.main_month_int
+            ),
+            InMemoryItineraryFilters.experience_fears_phobias_medical_predicate(
+                trip_params.fears_phobias_medical
+            ),
+            InMemoryItineraryFilters.filter_severe_dietary_exclusions_predicate(
+                trip_params.dietary
+            ),
+        )
+        if predicate is not None
+    ]
+
+    for shell, experiences in candidates:
+        if is_not_excluded is not None and not is_not_excluded(
+            ItineraryData(shell=shell)
+        ):
+            continue
+
+        suitable_experiences = [
+            experience
+            for experience in experiences
+            if all(
+                predicate(ItineraryData(shell=shell, experiences=[experience]))
+                for predicate in experience_predicates
+            )
+        ]
+
+        yield from _combinations(
+            shell,
+            suitable_experiences,
+            experiences_per_itinerary,
+            pace=trip_params.pace,
+        )
+
+
+def _combinations(
+    shell: ShellData,
+    experiences: List[ExperienceData],
+    size: int,
+    pace: Optional[int] = None,
+) -> Iterator[ItineraryData]:
+    """
+    Same combinations, in the same order, as itertools.combinations, but built
+    depth first so that a partial combination over the pace budget is abandoned
+    """
+    # Only the slower paces have an upper limit on booked time to prune against
+    has_budget = (
+        pace in PACE_BOOKED_TIME_LIMITS and PACE_BOOKED_TIME_LIMITS[pace][0] == "lt"
+    )
+
+    def within_budget(total_experience_duration: int) -> bool:
+        percentage = booked_time_percentage(
+            total_experience_duration=total_experience_duration,
+            transport_duration_minutes=shell.transport_duration_minutes,
+            length=shell.length,
+        )
+        return pace is None or is_suitable_pace(pace, percentage)
+
+    def extend(
+        start: int, chosen: List[ExperienceData], total_experience_duration: int
+    ) -> Iterator[ItineraryData]:
+        if len(chosen) == size:
+            if within_budget(total_experience_duration):
+                yield ItineraryData(shell=shell, experiences=list(chosen))
+            return
+
+        for position in range(start, len(experiences) - (size - len(chosen)) + 1):
+            experience = experiences[position]
+            duration = total_experience_duration + experience.duration_minutes
+
+            if has_budget and not within_budget(duration):
+                continue
+
+            chosen.append(experience)
+            yield from extend(position + 1, chosen, duration)
+            chosen.pop()
+
+    if has_budget and not within_budget(0):
+        # The shell's transport alone uses up the pace budget
+        return
+
+    yield from extend(0, [], 0)
+
+
+def load_second_tier_candidates() -> List[SecondTierCandidates]:
+    """
+    Pair every shell with the experiences found on any of its itineraries
+    """
+    shell_experience_ids: Dict[int, List[int]] = {}
+    for shell_id, experience_id in (
+        Itinerary.experiences.through.objects.order_by(
+            "itinerary__shell_id", "experience_id"
+        )
+        .values_list("itinerary__shell_id", "experience_id")
+        .distinct()
+    ):
+        shell_experience_ids.setdefault(shell_id, []).append(experience_id)
+
+    shells = load_shells(Shell.objects.filter(itineraries__isnull=False).distinct())
+    experiences = load_experiences(
+        Experience.objects.filter(itinerary__isnull=False).distinct()
+    )
+
+    return [
+        (
+            shells[shell_id],
+            [experiences[experience_id] for experience_id in experience_ids],
+        )
+        for shell_id, experience_ids in shell_experience_ids.items()
+    ]
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from django.db import transaction
+from django.db.models import Model, Q, QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+
+from matchmaking.cache import bump_catalog_version
+from matchmaking.models import (
+    City,
+    Country,
+    Destination,
+    Experience,
+    ExperienceThemeMinimumRatings,
+    ExperienceType,
+    Itinerary,
+    Shell,
+)
+from matchmaking.summaries import rebuild_summaries
+
+# Every model that a matchmaking filter reads from. Note that QuerySet.update()
+# and bulk_create() don't send these signals, so bump_catalog_version() has to be
+# called after using them.
+CATALOG_MODELS = (
+    Itinerary,
+    Experience,
+    Shell,
+    ExperienceType,
+    ExperienceThemeMinimumRatings,
+    Destination,
+    City,
+    Country,
+)
+
+CATALOG_M2M_THROUGH_MODELS = (
+    Itinerary.experiences.through,
+    Experience.experience_types.through,
+    Experience.theme_minimum_ratings.through,
+)
+
+
+# The version is only bumped once the change is committed. Bumped before, another
+# request could match against the old rows and cache them under the new version.
+def catalog_changed(sender: Any, using: Optional[str] = None, **kwargs: Any) -> None:
+    transaction.on_commit(bump_catalog_version, using=using)
+
+
+def catalog_relations_changed(
+    sender: Any, action: str, using: Optional[str] = None, **kwargs: Any
+) -> None:
+    if action.startswith("post_"):
+        transaction.on_commit(bump_catalog_version, using=using)
+
+
+# The lookups from Itinerary to each model its summary is derived from
+SUMMARY_SOURCE_LOOKUPS: Dict[Type[Model], List[str]] = {
+    Itinerary: ["pk__in"],
+    Shell: ["shell__in"],
+    Destination: ["shell__destination__in"],
+    City: [
+        "shell__destination__primary_city__in",
+        "shell__flying_to_city__in",
+        "shell__flying_back_from_city__in",
+    ],
+    Country: [
+        "shell__destination__primary_city__country__in",
+        "shell__flying_to_city__country__in",
+        "shell__flying_back_from_city__country__in",
+    ],
+    Experience: ["experiences__in"],
+    ExperienceType: ["experiences__experience_types__in"],
+    ExperienceThemeMinimumRatings: ["experiences__theme_minimum_ratings__in"],
+}
+
+# The side of each relation that summaries are derived from. Changing a
+# relation only changes the summaries of the rows changed on this side.
+SUMMARY_RELATION_SIDES: Dict[Type[Model], Type[Model]] = {
+    Itinerary.experiences.through: Itinerary,
+    Experience.experience_types.through: Experience,
+    Experience.theme_minimum_ratings.through: Experience,
+}
+
+# Ids of itineraries to rebuild once a delete or m2m change is done, taken
+# before it while they can still be found through the relations
+SUMMARY_PENDING_IDS_ATTRIBUTE = "_pending_summary_itinerary_ids"
+
+
+def summarised_itineraries(
+    model: Type[Model], pks: Optional[Iterable[Any]]
+) -> QuerySet[Itinerary]:
+    """
+    Itineraries whose summaries are derived from the given rows of model
+    """
+    if model not in SUMMARY_SOURCE_LOOKUPS or not pks:
+        return Itinerary.objects.none()
+
+    pks = list(pks)
+    query = Q()
+    for lookup in SUMMARY_SOURCE_LOOKUPS[model]:
+        query |= Q(**{lookup: pks})
+
+    return Itinerary.objects.filter(query).distinct()
+
+
+def _pending_summary_ids(instance: Model) -> List[int]:
+    return list(instance.__dict__.pop(SUMMARY_PENDING_IDS_ATTRIBUTE, []))
+
+
+def _itinerary_ids(itineraries: QuerySet[Itinerary]) -> List[int]:
+    return list(itineraries.values_list("id", flat=True))
+
+
+def summary_source_saved(
+    sender: Any, instance: Optional[Model], raw: bool = False, **kwargs: Any
+) -> None:
+    # Fixtures may be loaded before the rows they refer to, rebuild after instead
+    if instance is not None and not raw:
+        rebuild_summaries(summarised_itineraries(sender, [instance.pk]))
+
+
+def summary_source_deleting(
+    sender: Any, instance: Optional[Model], **kwargs: Any
+) -> None:
+    if instance is not None:
+        instance.__dict__[SUMMARY_PENDING_IDS_ATTRIBUTE] = _itinerary_ids(
+            summarised_itineraries(sender, [instance.pk])
+        )
+
+
+def summary_source_deleted(
+    sender: Any, instance: Optional[Model], **kwargs: Any
+) -> None:
+    if instance is not None:
+        rebuild_summaries(
+            Itinerary.objects.filter(id__in=_pending_summary_ids(instance))
+        )
+
+
+def summary_relations_changed(
+    sender: Any,
+    instance: Optional[Model],
+    action: str,
+    pk_set: Optional[Iterable[Any]] = None,
+    **kwargs: Any,
+) -> None:
+    if instance is None or sender not in SUMMARY_RELATION_SIDES:
+        return
+
+    side = SUMMARY_RELATION_SIDES[sender]
+
+    # Only the summaries of the changed rows on the summarised side are rebuilt,
+    # not those of everything related to the other side
+    if isinstance(instance, side):
+        if action.startswith("post_"):
+            rebuild_summaries(summarised_itineraries(side, [instance.pk]))
+    elif action in ("post_add", "post_remove"):
+        rebuild_summaries(summarised_itineraries(side, pk_set))
+    elif action == "pre_clear":
+        # The rows cleared from the other side can only be found before
+        instance.__dict__[SUMMARY_PENDING_IDS_ATTRIBUTE] = _itinerary_ids(
+            summarised_itineraries(type(instance), [instance.pk])
+        )
+    elif action == "post_clear":
+        rebuild_summaries(
+            Itinerary.objects.filter(id__in=_pending_summary_ids(instance))
+        )
+
+
+# Connected for each model rather than for every sender, since any delete
+# receiver for a model stops Django fast deleting its rows
+for catalog_model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=catalog_model)
+    post_delete.connect(catalog_changed, sender=catalog_model)
+
+for through_model in CATALOG_M2M_THROUGH_MODELS:
+    m2m_changed.connect(catalog_relations_changed, sender=through_model)
+
+for through_model in SUMMARY_RELATION_SIDES:
+    m2m_changed.connect(summary_relations_changed, sender=through_model)
+
+for summary_source in SUMMARY_SOURCE_LOOKUPS:
+    post_save.connect(summary_source_saved, sender=summary_source)
+
+    # An itinerary's own summary is deleted along with it
+    if summary_source is not Itinerary:
+        pre_delete.connect(summary_source_deleting, sender=summary_source)
+        post_delete.connect(summary_source_deleted, sender=summary_source)
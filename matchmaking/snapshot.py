@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from django.db.models import Q, QuerySet
+
+from matchmaking.models import (
+    City,
+    CityData,
+    Country,
+    CountryData,
+    Destination,
+    DestinationData,
+    Experience,
+    ExperienceData,
+    ExperienceThemeMinimumRatings,
+    ExperienceThemeMinimumRatingsData,
+    ExperienceType,
+    ExperienceTypeData,
+    Itinerary,
+    ItineraryData,
+    Shell,
+    ShellData,
+)
+
+# Bulk loaders that turn the matchmaking tables into in-memory models.
+#
+# Each loader runs a fixed number of values() queries, however many rows there
+# are, and builds every row exactly once. Rows referenced from many places, such
+# as an experience on many itineraries or a country with many cities, are shared
+# by reference, so memory grows with the number of distinct rows.
+
+
+def load_itinerary_snapshot(itineraries: QuerySet[Itinerary]) -> List[ItineraryData]:
+    shells = load_shells(Shell.objects.filter(itineraries__in=itineraries).distinct())
+    experiences = load_experiences(
+        Experience.objects.filter(itinerary__in=itineraries).distinct()
+    )
+
+    itinerary_experience_ids: Dict[int, List[int]] = {}
+    for itinerary_id, experience_id in (
+        Itinerary.experiences.through.objects.filter(itinerary__in=itineraries)
+        .order_by("id")
+        .values_list("itinerary_id", "experience_id")
+    ):
+        itinerary_experience_ids.setdefault(itinerary_id, []).append(experience_id)
+
+    return [
+        ItineraryData(
+            shell=shells[shell_id],
+            experiences=[
+                experiences[experience_id]
+                for experience_id in itinerary_experience_ids.get(itinerary_id, [])
+            ],
+            id=itinerary_id,
+        )
+        for itinerary_id, shell_id in itineraries.order_by("id").values_list(
+            "id", "shell_id"
+        )
+    ]
+
+
+def load_shells(shells: QuerySet[Shell]) -> Dict[int, ShellData]:
+    # Only the rows the shells refer to, so that loading a few shells doesn't
+    # read every place in the catalog
+    destination_rows = Destination.objects.filter(
+        id__in=shells.values("destination_id")
+    )
+    city_rows = City.objects.filter(
+        Q(id__in=destination_rows.values("primary_city_id"))
+        | Q(id__in=shells.values("flying_to_city_id"))
+        | Q(id__in=shells.values("flying_back_from_city_id"))
+    )
+
+    countries = {
+        name: CountryData(name=name)
+        for name in Country.objects.filter(
+            name__in=city_rows.values("country_id")
+        ).values_list("name", flat=True)
+    }
+    cities = {
+        city_id: CityData(country=countries[country_id], id=city_id, name=name)
+        for city_id, name, country_id in city_rows.values_list(
+            "id", "name", "country_id"
+        )
+    }
+    destinations = {
+        destination_id: DestinationData(primary_city=cities[city_id], name=name)
+        for destination_id, name, city_id in destination_rows.values_list(
+            "id", "name", "primary_city_id"
+        )
+    }
+
+    return {
+        shell_id: ShellData(
+            destination=destinations[destination_id],
+            flying_to_city=cities[flying_to_city_id],
+            flying_back_from_city=cities[flying_back_from_city_id],
+            length=length,
+            transport_duration_minutes=transport_duration_minutes,
+            id=shell_id,
+        )
+        for (
+            shell_id,
+            destination_id,
+            flying_to_city_id,
+            flying_back_from_city_id,
+            length,
+            transport_duration_minutes,
+        ) in shells.values_list(
+            "id",
+            "destination_id",
+            "flying_to_city_id",
+            "flying_back_from_city_id",
+            "length",
+            "transport_duration_minutes",
+        )
+    }
+
+
+def load_experiences(experiences: QuerySet[Experience]) -> Dict[int, ExperienceData]:
+    experience_types = {
+        experience_type_id: ExperienceTypeData(
+            name=name, type=type, affected_by_group_private=affected_by_group_private
+        )
+        for (
+            experience_type_id,
+            name,
+            type,
+            affected_by_group_private,
+        ) in ExperienceType.objects.filter(experience__in=experiences)
+        .distinct()
+        .values_list("id", "name", "type", "affected_by_group_private")
+    }
+    theme_minimum_ratings = {
+        theme_minimum_rating_id: ExperienceThemeMinimumRatingsData(
+            theme=theme, rating=rating
+        )
+        for (
+            theme_minimum_rating_id,
+            theme,
+            rating,
+        ) in ExperienceThemeMinimumRatings.objects.filter(experience__in=experiences)
+        .distinct()
+        .values_list("id", "theme", "rating")
+    }
+
+    experience_type_ids: Dict[int, List[int]] = {}
+    for experience_id, experience_type_id in (
+        Experience.experience_types.through.objects.filter(experience__in=experiences)
+        .order_by("id")
+        .values_list("experience_id", "experiencetype_id")
+    ):
+        experience_type_ids.setdefault(experience_id, []).append(experience_type_id)
+
+    theme_minimum_rating_ids: Dict[int, List[int]] = {}
+    for experience_id, theme_minimum_rating_id in (
+        Experience.theme_minimum_ratings.through.objects.filter(
+            experience__in=experiences
+        )
+        .order_by("id")
+        .values_list("experience_id", "experiencethememinimumratings_id")
+    ):
+        theme_minimum_rating_ids.setdefault(experience_id, []).append(
+            theme_minimum_rating_id
+        )
+
+    return {
+        experience_id: ExperienceData(
+            experience_types=[
+                experience_types[experience_type_id]
+                for experience_type_id in experience_type_ids.get(experience_id, [])
+            ],
+            theme_minimum_ratings=[
+                theme_minimum_ratings[theme_minimum_rating_id]
+                for theme_minimum_rating_id in theme_minimum_rating_ids.get(
+                    experience_id, []
+                )
+            ],
+            months=months,
+            fears_phobias_medical=fears_phobias_medical,
+            unsuitable_for_dietary_requirement=unsuitable_for_dietary_requirement,
+            duration_minutes=duration_minutes,
+            id=experience_id,
+        )
+        for (
+            experience_id,
+            months,
+            fears_phobias_medical,
+            unsuitable_for_dietary_requirement,
+            duration_minutes,
+        ) in experiences.values_list(
+            "id",
+            "months",
+            "fears_phobias_medical",
+            "unsuitable_for_dietary_requirement",
+            "duration_minutes",
+        )
+    }
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Iterator, List, Set
+
+from django.db.models import QuerySet
+
+from matchmaking.filters.experience_types import (
+    DINING_EXPERIENCE_TYPE_NAMES,
+    FOOD_EXPERIENCE_TYPE_NAMES,
+)
+from matchmaking.filters.locations import shell_locations
+from matchmaking.filters.pace import booked_time_percentage
+from matchmaking.models import (
+    ExperienceThemes,
+    Itinerary,
+    ItineraryData,
+    ItinerarySummary,
+    Month,
+)
+from matchmaking.snapshot import load_itinerary_snapshot
+
+SUMMARY_FIELDS = [
+    "months",
+    "fears_phobias_medical",
+    "unsuitable_for_dietary_requirement",
+    "has_food_experience",
+    "has_dining_experience",
+    "total_experience_minutes",
+    "booked_time_percentage",
+    "location_tokens",
+    "theme_minimum_ratings",
+]
+
+
+def summarise(itinerary: ItineraryData) -> ItinerarySummary:
+    """
+    Summary of an in-memory itinerary, which must have its id
+    """
+    if itinerary.id is None:
+        raise ValueError("Only saved itineraries can be summarised")
+
+    months = set(Month.values)
+    fears_phobias_medical: Set[str] = set()
+    unsuitable_for_dietary_requirement: Set[str] = set()
+    experience_type_names: Set[str] = set()
+    theme_minimum_ratings = {theme: 0 for theme in ExperienceThemes.values}
+
+    for experience in itinerary.experiences:
+        months.intersection_update(experience.months)
+        fears_phobias_medical.update(experience.fears_phobias_medical)
+        unsuitable_for_dietary_requirement.update(
+            experience.unsuitable_for_dietary_requirement
+        )
+        experience_type_names.update(
+            experience_type.name for experience_type in experience.experience_types
+        )
+        for minimum_rating in experience.theme_minimum_ratings:
+            theme_minimum_ratings[minimum_rating.theme] = max(
+                theme_minimum_ratings.get(minimum_rating.theme, 0),
+                minimum_rating.rating,
+            )
+
+    total_experience_minutes = sum(
+        experience.duration_minutes for experience in itinerary.experiences
+    )
+
+    return ItinerarySummary(
+        itinerary_id=itinerary.id,
+        months=sorted(months),
+        fears_phobias_medical=sorted(fears_phobias_medical),
+        unsuitable_for_dietary_requirement=sorted(unsuitable_for_dietary_requirement),
+        has_food_experience=not experience_type_names.isdisjoint(
+            FOOD_EXPERIENCE_TYPE_NAMES
+        ),
+        has_dining_experience=not experience_type_names.isdisjoint(
+            DINING_EXPERIENCE_TYPE_NAMES
+        ),
+        total_experience_minutes=total_experience_minutes,
+        booked_time_percentage=booked_time_percentage(
+            total_experience_duration=total_experience_minutes,
+            transport_duration_minutes=itinerary.shell.transport_duration_minutes,
+            length=itinerary.shell.length,
+        ),
+        # Lower-cased like the lead's exclusions, not accent folded
+        location_tokens=sorted(
+            {location.lower() for location in shell_locations(itinerary.shell)}
+        ),
+        theme_minimum_ratings=theme_minimum_ratings,
+    )
+
+
+def _id_batches(
+    itineraries: QuerySet[Itinerary], batch_size: int
+) -> Iterator[List[int]]:
+    cursor = 0
+
+    while batch := list(
+        itineraries.filter(id__gt=cursor)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    ):
+        yield batch
+        cursor = batch[-1]
+
+
+def rebuild_summaries(itineraries: QuerySet[Itinerary], batch_size: int = 5_000) -> int:
+    """
+    Create or update the summaries of the itineraries, batch_size at a time.
+    Returns how many were rebuilt.
+    """
+    rebuilt = 0
+
+    for itinerary_ids in _id_batches(itineraries, batch_size):
+        snapshot = load_itinerary_snapshot(
+            Itinerary.objects.filter(id__in=itinerary_ids)
+        )
+
+        ItinerarySummary.objects.bulk_create(
+            [summarise(itinerary) for itinerary in snapshot],
+            update_conflicts=True,
+            unique_fields=["itinerary"],
+            update_fields=SUMMARY_FIELDS,
+        )
+        rebuilt += len(snapshot)
+
+    return rebuilt
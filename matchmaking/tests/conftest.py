@@ -0,0 +1,18 @@
+import pytest
+from django.db import connections
+from django.db.backends.postgresql.base import DatabaseWrapper
+
+
+@pytest.fixture(scope="session")
+def postgresql():
+    """
+    A Postgres connection to compile queries with. It's never opened, so needs
+    no server.
+    """
+    return DatabaseWrapper(
+        {
+            **connections["default"].settings_dict,
+            "ENGINE": "django.db.backends.postgresql",
+        },
+        alias="postgresql",
+    )
@@ -1,3 +1,6 @@
+import random
+from typing import List
+
 import factory
 from factory import fuzzy
 
@@ -11,6 +14,7 @@ from matchmaking.models import (
     ExperienceData,
     ItineraryData,
     ExperienceThemes,
+    Experience,
 )
 
 
@@ -92,3 +96,45 @@ class ItineraryDataFactory(factory.Factory):
     experiences = factory.List(
         [factory.SubFactory(ExperienceDataFactory) for _ in range(3)]
     )
+
+
+FEARS = Experience.FearPhobiasMedical.values + ["spiders"]
+LOCATIONS = ["Paris", "France", "Rome", "Italy", "Lisbon", "Portugal"]
+EXPERIENCE_TYPE_NAMES = ["Food tour & tastings", "Dining experience", "Hiking"]
+
+
+def create_random_catalog(rng: random.Random, size: int) -> List[ItineraryData]:
+    """
+    Itineraries drawing from a small pool of locations, fears and experience types,
+    so that every filter both includes and excludes some of them
+    """
+
+    countries = [CountryDataFactory(name=name) for name in LOCATIONS[1::2]]
+    cities = [
+        CityDataFactory(name=name, country=country)
+        for name, country in zip(LOCATIONS[::2], countries)
+    ]
+
+    def random_experience() -> ExperienceData:
+        return ExperienceDataFactory(
+            months=rng.sample(range(1, 13), rng.randint(1, 12)),
+            fears_phobias_medical=rng.sample(FEARS, rng.randint(0, 2)),
+            experience_types=[
+                ExperienceTypeDataFactory(name=rng.choice(EXPERIENCE_TYPE_NAMES))
+            ],
+            duration_minutes=rng.randint(30, 600),
+        )
+
+    return [
+        ItineraryDataFactory(
+            shell=ShellDataFactory(
+                destination=DestinationDataFactory(primary_city=rng.choice(cities)),
+                flying_to_city=rng.choice(cities),
+                flying_back_from_city=rng.choice(cities),
+                length=rng.randint(1, 10),
+                transport_duration_minutes=rng.randint(60, 480),
+            ),
+            experiences=[random_experience() for _ in range(rng.randint(0, 4))],
+        )
+        for _ in range(size)
+    ]
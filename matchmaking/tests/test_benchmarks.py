@@ -0,0 +1,98 @@
+from matchmaking.benchmarks.catalog import (
+    CatalogSpec,
+    build_in_memory_catalog,
+    generate_trip_parameters,
+)
+from matchmaking.benchmarks.explain import index_scans
+from matchmaking.benchmarks.runner import (
+    benchmark_engine,
+    compare,
+    in_memory_engine,
+    percentile,
+)
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+
+
+def test_percentile_interpolates():
+    samples = [4.0, 1.0, 3.0, 2.0, 5.0]
+
+    assert percentile(samples, 0) == 1.0
+    assert percentile(samples, 0.5) == 3.0
+    assert percentile(samples, 0.95) == 4.8
+    assert percentile(samples, 1) == 5.0
+
+
+def test_synthetic_catalog_is_deterministic():
+    first = build_in_memory_catalog(CatalogSpec(size=200, seed=1))
+    second = build_in_memory_catalog(CatalogSpec(size=200, seed=1))
+    trip_params_list = generate_trip_parameters(10, seed=1)
+
+    assert len(first) == 200
+    assert trip_params_list == generate_trip_parameters(10, seed=1)
+    for trip_params in trip_params_list:
+        assert [
+            itinerary.id
+            for itinerary in InMemoryItineraryFilters(first).run(trip_params)
+        ] == [
+            itinerary.id
+            for itinerary in InMemoryItineraryFilters(second).run(trip_params)
+        ]
+
+
+def test_benchmark_engine_times_every_stage():
+    catalog = build_in_memory_catalog(CatalogSpec(size=100))
+
+    results = benchmark_engine(
+        in_memory_engine(catalog),
+        trip_params_list=generate_trip_parameters(3),
+        catalog_size=100,
+    )
+
+    assert set(results) == {
+        "in_memory/100/experience_months",
+        "in_memory/100/experience_fears_phobias_medical",
+        "in_memory/100/filter_severe_dietary_exclusions",
+        "in_memory/100/filter_itinerary_pace",
+        "in_memory/100/filter_location_exclusions",
+        "in_memory/100/run",
+    }
+    for metrics in results.values():
+        assert metrics["calls"] == 3
+        assert metrics["p50_ms"] <= metrics["p95_ms"] <= metrics["p99_ms"]
+        assert 0 <= metrics["mean_results"] <= 100
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = {
+        "in_memory/100/run": {"p50_ms": 10.0, "p95_ms": 20.0, "peak_memory_kb": 5.0},
+        "in_memory/100/experience_months": {"p50_ms": 1.0},
+        "orm/100/run": {"p50_ms": 1.0},
+    }
+    current = {
+        "in_memory/100/run": {"p50_ms": 10.5, "p95_ms": 30.0, "peak_memory_kb": 5.0},
+        "in_memory/100/experience_months": {"p50_ms": 1.09},
+    }
+
+    regressions = compare(baseline, current, threshold=0.1)
+
+    assert [(r.key, r.metric) for r in regressions] == [("in_memory/100/run", "p95_ms")]
+    assert regressions[0].change == 0.5
+
+
+def test_index_scans_finds_every_kind_of_index_scan():
+    plan = """
+Hash Anti Join  (cost=120.51..245.30 rows=900 width=8)
+  ->  Seq Scan on matchmaking_itinerary  (cost=0.00..15.00 rows=1000 width=8)
+  ->  Hash  (cost=95.51..95.51 rows=2000 width=4)
+        ->  Nested Loop  (cost=12.30..95.51 rows=2000 width=4)
+              ->  Bitmap Heap Scan on matchmaking_experience u2
+                    ->  Bitmap Index Scan on experience_fears_gin
+              ->  Index Only Scan using itinerary_experiences_reverse_idx on matchmaking_itinerary_experiences u1
+              ->  Index Scan using matchmaking_experience_pkey on matchmaking_experience
+"""
+
+    assert index_scans(plan) == [
+        "experience_fears_gin",
+        "itinerary_experiences_reverse_idx",
+        "matchmaking_experience_pkey",
+    ]
@@ -0,0 +1,140 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models.signals import m2m_changed, post_save
+
+from matchmaking.cache import (
+    ResultCache,
+    acatalog_version,
+    bump_catalog_version,
+    catalog_version,
+    check_shared_cache,
+    trip_parameters_key,
+)
+from matchmaking.models import Experience, Itinerary
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+
+def test_trip_parameters_key_is_canonical():
+    trip_params = TripParametersFactory(
+        fears_phobias_medical=["heights", "cats"],
+        dietary=["vegan", "no_fish"],
+        location_exclusions=["Paris", "ROME"],
+    )
+    equivalent = dataclasses.replace(
+        trip_params,
+        fears_phobias_medical=["cats", "heights", "cats"],
+        dietary=["no_fish", "vegan"],
+        location_exclusions=["rome", "paris"],
+        ratings=dataclasses.replace(
+            trip_params.ratings, outdoor=trip_params.ratings.outdoor + 0.0001
+        ),
+    )
+    different = dataclasses.replace(trip_params, dietary=["vegan"])
+
+    assert trip_parameters_key(trip_params) == trip_parameters_key(equivalent)
+    assert trip_parameters_key(trip_params) != trip_parameters_key(different)
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_result_cache_get_or_compute():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return (1, 2)
+
+    assert cache.get_or_compute("key", compute) == (1, 2)
+    assert cache.get_or_compute("key", compute) == (1, 2)
+    assert len(calls) == 1
+
+
+def test_catalog_changes_bump_the_version(monkeypatch):
+    version = catalog_version()
+    # Outside any transaction, without opening a connection
+    monkeypatch.setattr(connection, "get_autocommit", lambda: True)
+
+    post_save.send(sender=Itinerary, instance=None, created=False)
+    assert catalog_version() == version + 1
+
+    m2m_changed.send(
+        sender=Experience.experience_types.through,
+        instance=None,
+        action="post_add",
+    )
+    assert catalog_version() == version + 2
+
+    m2m_changed.send(
+        sender=Experience.experience_types.through,
+        instance=None,
+        action="pre_add",
+    )
+    post_save.send(sender=Experience.FearPhobiasMedical, instance=None)
+    assert catalog_version() == version + 2
+
+
+def test_acatalog_version_matches_catalog_version():
+    bump_catalog_version()
+
+    assert asyncio.run(acatalog_version()) == catalog_version()
+
+
+def test_catalog_changes_bump_the_version_once_committed(monkeypatch):
+    version = catalog_version()
+    # As if inside transaction.atomic(), without opening a connection
+    monkeypatch.setattr(connection, "in_atomic_block", True)
+    monkeypatch.setattr(connection, "run_on_commit", [])
+
+    post_save.send(sender=Itinerary, instance=None, created=False, using="default")
+    m2m_changed.send(
+        sender=Experience.experience_types.through,
+        instance=None,
+        action="post_remove",
+        using="default",
+    )
+    assert catalog_version() == version
+
+    for _, callback, _ in connection.run_on_commit:
+        callback()
+    assert catalog_version() == version + 2
+
+
+def test_use_cache_needs_a_shared_cache():
+    trip_params = TripParametersFactory()
+
+    # Django's default, per-process LocMemCache
+    with pytest.raises(ImproperlyConfigured):
+        Itinerary.objects.after_matchmaking_filters(trip_params, use_cache=True)
+
+    with pytest.raises(ImproperlyConfigured):
+        asyncio.run(
+            Itinerary.objects.aafter_matchmaking_filters(trip_params, use_cache=True)
+        )
+
+
+def test_check_shared_cache(settings, tmp_path):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tmp_path,
+        }
+    }
+
+    check_shared_cache()
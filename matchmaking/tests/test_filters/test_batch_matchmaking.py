@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from matchmaking.filters.batch_matchmaking import BatchItineraryFilters
+from matchmaking.filters.compiled_matchmaking import CompiledCatalog
+from matchmaking.filters.experience_types import DINING_EXPERIENCE_TYPE_NAMES
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.models import Experience, ExperienceThemes
+from matchmaking.tests.factories.in_memory_models import (
+    FEARS,
+    LOCATIONS,
+    create_random_catalog,
+)
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+THEME_RATINGS = {theme.value: theme.name.lower() for theme in ExperienceThemes}
+
+
+def matches_every_filter(itinerary, trip_params):
+    """
+    The ItineraryFilters chain, one itinerary at a time
+    """
+    experiences = itinerary.experiences
+    experience_type_names = {
+        experience_type.name
+        for experience in experiences
+        for experience_type in experience.experience_types
+    }
+    ratings = trip_params.ratings.normalised_rounded
+    other_filters = InMemoryItineraryFilters.predicate_chain(trip_params)
+
+    return (
+        other_filters(itinerary)
+        and not any(
+            set(trip_params.fears_phobias_medical) & set(e.fears_phobias_medical)
+            for e in experiences
+        )
+        and not any(
+            minimum_rating.rating > ratings[THEME_RATINGS[minimum_rating.theme]]
+            for e in experiences
+            for minimum_rating in e.theme_minimum_ratings
+        )
+        and not any(
+            set(trip_params.dietary) & set(e.unsuitable_for_dietary_requirement)
+            for e in experiences
+        )
+        and not (
+            trip_params.num_travellers == 1
+            and experience_type_names & DINING_EXPERIENCE_TYPE_NAMES
+        )
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_run_matches_every_filter(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+    dietary_requirements = sorted(
+        {
+            dietary
+            for itinerary in itineraries
+            for experience in itinerary.experiences
+            for dietary in experience.unsuitable_for_dietary_requirement
+        }
+    )
+    trip_params_list = [
+        TripParametersFactory(
+            num_travellers=rng.randint(1, 2),
+            pace=rng.randint(1, 5),
+            main_month_int=rng.randint(1, 12),
+            fears_phobias_medical=rng.sample(FEARS, rng.randint(0, 2)),
+            dietary=[
+                *rng.sample(dietary_requirements, rng.randint(0, 3)),
+                *rng.choice([[], [Experience.DietaryRequirement.OTHER_SEVERE]]),
+            ],
+            location_exclusions=rng.sample(LOCATIONS, rng.randint(0, 2)),
+        )
+        for _ in range(30)
+    ]
+
+    batch_filters = BatchItineraryFilters(CompiledCatalog.compile(itineraries))
+
+    assert batch_filters.run(trip_params_list) == [
+        [
+            itinerary
+            for itinerary in itineraries
+            if matches_every_filter(itinerary, trip_params)
+        ]
+        for trip_params in trip_params_list
+    ]
+
+
+def test_match_matrix_shape_and_shared_stage_masks():
+    itineraries = create_random_catalog(random.Random(0), size=50)
+    trip_params_list = [
+        TripParametersFactory(pace=3, main_month_int=6, dietary=[], num_travellers=2)
+        for _ in range(10)
+    ]
+
+    batch_filters = BatchItineraryFilters(CompiledCatalog.compile(itineraries))
+    matrix = batch_filters.match_matrix(trip_params_list)
+
+    assert matrix.shape == (10, 50)
+    # Only the low cardinality stages are kept between calls
+    assert set(batch_filters._stage_masks) == {
+        ("experience_months", 6),
+        ("filter_severe_dietary_exclusions", False),
+        ("dining_experiences_solo_travellers", False),
+        ("filter_itinerary_pace", 3),
+    }
@@ -0,0 +1,187 @@
+import random
+
+import pytest
+
+from matchmaking.filters.compiled_matchmaking import (
+    CompiledCatalog,
+    CompiledItineraryFilters,
+)
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.models import Experience
+from matchmaking.tests.factories.in_memory_models import (
+    LOCATIONS,
+    ExperienceDataFactory,
+    ItineraryDataFactory,
+    ShellDataFactory,
+    create_random_catalog,
+)
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_run_matches_in_memory_filters(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+    catalog = CompiledCatalog.compile(itineraries)
+
+    for _ in range(20):
+        trip_params = TripParametersFactory(
+            pace=rng.randint(1, 5),
+            main_month_int=rng.randint(1, 12),
+            dietary=rng.choice([[], [Experience.DietaryRequirement.OTHER_SEVERE]]),
+            location_exclusions=[
+                location.upper() for location in rng.sample(LOCATIONS, 2)
+            ],
+        )
+
+        expected = InMemoryItineraryFilters(itineraries=itineraries).run(trip_params)
+        compiled = CompiledItineraryFilters(catalog=catalog).run(trip_params)
+
+        assert compiled == expected
+
+
+@pytest.mark.parametrize("pace", range(1, 6))
+def test_pace_of_shells_without_days_matches_in_memory_filters(pace):
+    itineraries = [
+        # Nothing booked at all
+        ItineraryDataFactory(
+            shell=ShellDataFactory(length=0, transport_duration_minutes=0),
+            experiences=[],
+        ),
+        ItineraryDataFactory(
+            shell=ShellDataFactory(length=0, transport_duration_minutes=60),
+            experiences=[ExperienceDataFactory(duration_minutes=30)],
+        ),
+        ItineraryDataFactory(
+            shell=ShellDataFactory(length=1, transport_duration_minutes=0),
+            experiences=[],
+        ),
+    ]
+    catalog = CompiledCatalog.compile(itineraries)
+
+    expected = InMemoryItineraryFilters(itineraries=itineraries)
+    expected.filter_itinerary_pace(pace)
+    compiled = CompiledItineraryFilters(catalog=catalog)
+    compiled.filter_itinerary_pace(pace)
+
+    assert compiled.itineraries == expected.itineraries
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_experience_fears_phobias_medical_matches_in_memory_filters(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+    catalog = CompiledCatalog.compile(itineraries)
+
+    for fears in (["heights"], ["spiders", "cats"], ["unknown"], []):
+        expected = InMemoryItineraryFilters(itineraries=itineraries)
+        expected.experience_fears_phobias_medical(fears)
+        compiled = CompiledItineraryFilters(catalog=catalog)
+        compiled.experience_fears_phobias_medical(fears)
+
+        assert compiled.itineraries == expected.itineraries
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_experiences_dietary_requirements(seed):
+    rng = random.Random(seed)
+    dietary_requirements = Experience.DietaryRequirement.values + ["no_fish"]
+    itineraries = [
+        ItineraryDataFactory(
+            experiences=[
+                ExperienceDataFactory(
+                    unsuitable_for_dietary_requirement=rng.sample(
+                        dietary_requirements, rng.randint(0, 2)
+                    )
+                )
+                for _ in range(rng.randint(0, 3))
+            ]
+        )
+        for _ in range(100)
+    ]
+    catalog = CompiledCatalog.compile(itineraries)
+
+    for dietary in (rng.sample(dietary_requirements, 2), ["no_fish"], ["unknown"], []):
+        expected = [
+            itinerary
+            for itinerary in itineraries
+            if not any(
+                set(dietary).intersection(experience.unsuitable_for_dietary_requirement)
+                for experience in itinerary.experiences
+            )
+        ]
+        compiled = CompiledItineraryFilters(catalog=catalog)
+        compiled.experiences_dietary_requirements(dietary)
+
+        assert compiled.itineraries == expected
+
+
+def test_compile_masks():
+    itinerary = ItineraryDataFactory(
+        experiences=[
+            ExperienceDataFactory(
+                months=[1, 2, 3],
+                fears_phobias_medical=["heights"],
+                unsuitable_for_dietary_requirement=["vegan"],
+            ),
+            ExperienceDataFactory(
+                months=[2, 3, 4],
+                fears_phobias_medical=["cats"],
+                unsuitable_for_dietary_requirement=["no_fish"],
+            ),
+        ]
+    )
+    catalog = CompiledCatalog.compile([itinerary])
+
+    assert catalog.month_masks[0] == 0b110
+    assert (
+        catalog.fears_vocabulary.to_words(
+            catalog.fears_vocabulary.mask(["heights", "cats"])
+        ).tolist()
+        == catalog.fear_masks[0].tolist()
+    )
+    assert (
+        catalog.dietary_vocabulary.to_words(
+            catalog.dietary_vocabulary.mask(["vegan", "no_fish"])
+        ).tolist()
+        == catalog.dietary_masks[0].tolist()
+    )
+
+
+def test_empty_itinerary_is_available_every_month():
+    catalog = CompiledCatalog.compile([ItineraryDataFactory(experiences=[])])
+
+    itinerary_filter = CompiledItineraryFilters(catalog=catalog)
+    itinerary_filter.experience_months(7)
+    assert len(itinerary_filter.itineraries) == 1
+
+
+def test_fears_vocabulary_grows_past_one_word():
+    fears = [f"fear_{i}" for i in range(100)]
+    itineraries = [
+        ItineraryDataFactory(
+            experiences=[ExperienceDataFactory(fears_phobias_medical=[fear])]
+        )
+        for fear in fears
+    ]
+    catalog = CompiledCatalog.compile(itineraries)
+    assert catalog.fear_masks.shape == (100, 2)
+
+    itinerary_filter = CompiledItineraryFilters(catalog=catalog)
+    itinerary_filter.experience_fears_phobias_medical(["fear_99"])
+    assert itinerary_filter.itineraries == itineraries[:99]
+
+
+def test_iter_run_matches_run_across_batches():
+    rng = random.Random(0)
+    itineraries = create_random_catalog(rng, size=200)
+    trip_params = TripParametersFactory(pace=4, location_exclusions=["rome"])
+
+    expected = CompiledItineraryFilters(
+        catalog=CompiledCatalog.compile(itineraries)
+    ).run(trip_params)
+    streamed = CompiledItineraryFilters.iter_run(
+        iter(itineraries), trip_params, batch_size=7
+    )
+
+    assert list(streamed) == expected
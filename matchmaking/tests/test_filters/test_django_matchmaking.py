@@ -0,0 +1,118 @@
+import pytest
+
+from matchmaking.filters.django_matchmaking import ItineraryFilters
+from matchmaking.models import Experience, Itinerary
+from matchmaking.tests.factories.tm_form import (
+    TmFormRatingsFactory,
+    TripParametersFactory,
+)
+
+# The test database is SQLite, which can't hold the ArrayField tables, so these
+# only compile the filters' SQL for Postgres.
+
+
+def compile_sql(itineraries, connection):
+    return itineraries.query.get_compiler(connection=connection).as_sql()
+
+
+def outer_from_clause(sql):
+    """
+    The outer query's FROM and joins, before any subquery
+    """
+    return sql.split(" WHERE ", 1)[0]
+
+
+@pytest.mark.parametrize(
+    "stage",
+    [
+        lambda filters: filters.experience_months(main_month_int=3),
+        lambda filters: filters.experience_fears_phobias_medical(["Heights"]),
+        lambda filters: filters.experience_theme_minimum_ratings(
+            TmFormRatingsFactory()
+        ),
+        lambda filters: filters.experiences_dietary_requirements(["Vegan"]),
+        lambda filters: filters.filter_severe_dietary_exclusions(
+            [Experience.DietaryRequirement.OTHER_SEVERE]
+        ),
+        lambda filters: filters.dining_experiences_solo_travellers(num_travellers=1),
+    ],
+)
+def test_experience_stages_are_correlated_not_exists(stage, postgresql):
+    filters = ItineraryFilters(qs=Itinerary.objects.all())
+    stage(filters)
+
+    sql, _ = compile_sql(filters.qs, postgresql)
+
+    assert sql.count("NOT (EXISTS(") == 1
+    assert '= ("matchmaking_itinerary"."id")' in sql
+    assert "matchmaking_itinerary_experiences" not in outer_from_clause(sql)
+
+
+@pytest.mark.parametrize(
+    "stage",
+    [
+        lambda filters: filters.experience_fears_phobias_medical([]),
+        lambda filters: filters.experiences_dietary_requirements([]),
+        lambda filters: filters.filter_severe_dietary_exclusions(["Vegan"]),
+        lambda filters: filters.dining_experiences_solo_travellers(num_travellers=2),
+        lambda filters: filters.filter_location_exclusions([]),
+    ],
+)
+def test_stages_with_nothing_to_exclude_add_no_condition(stage, postgresql):
+    filters = ItineraryFilters(qs=Itinerary.objects.all())
+    stage(filters)
+
+    sql, _ = compile_sql(filters.qs, postgresql)
+
+    assert " WHERE " not in sql
+
+
+def test_filter_itinerary_pace_is_one_annotation(postgresql):
+    filters = ItineraryFilters(qs=Itinerary.objects.all())
+    filters.filter_itinerary_pace(pace=1)
+
+    sql, params = compile_sql(filters.qs, postgresql)
+
+    # Itineraries without experiences count as 0 minutes, and the division
+    # mustn't be integer division
+    assert 'COALESCE((SELECT SUM(U0."duration_minutes")' in sql
+    assert ")::double precision / (" in sql
+    # Shells without any days never reach the division
+    assert 'CASE WHEN ("matchmaking_shell"."length" <= %s) THEN %s ELSE' in sql
+    assert params[:2] == (0, float("inf"))
+    assert "GROUP BY" not in outer_from_clause(sql)
+    assert sql.rstrip(")").endswith("< %s")
+    assert params[-1] == 40
+
+
+def test_filter_location_exclusions_applies_every_entry(postgresql):
+    filters = ItineraryFilters(qs=Itinerary.objects.all())
+    filters.filter_location_exclusions(["Paris", "ITALY", "Lisbon"])
+
+    sql, params = compile_sql(filters.qs, postgresql)
+
+    for column in (
+        '"matchmaking_destination"."primary_city_id"',
+        '"matchmaking_shell"."flying_to_city_id"',
+        '"matchmaking_shell"."flying_back_from_city_id"',
+    ):
+        assert f"NOT ({column} IN (SELECT" in sql
+    # Matched against both city and country names, for each of the 3 cities
+    assert sorted(params) == sorted(["paris", "italy", "lisbon"] * 6)
+
+
+def test_run_is_one_statement(postgresql):
+    trip_params = TripParametersFactory(
+        fears_phobias_medical=["Heights"],
+        dietary=[Experience.DietaryRequirement.OTHER_SEVERE],
+        num_travellers=1,
+        location_exclusions=["Paris"],
+    )
+
+    itineraries = ItineraryFilters(qs=Itinerary.objects.all()).run(trip_params)
+    sql, params = compile_sql(itineraries, postgresql)
+
+    assert sql.count("NOT (EXISTS(") == 6
+    assert "matchmaking_itinerary_experiences" not in outer_from_clause(sql)
+    assert '"matchmaking_itinerary"."id" IN' not in sql
+    assert len(params) < 100
@@ -1,6 +1,13 @@
+import asyncio
+import random
+
 import pytest
 
-from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.instrumentation import Instrumentation
+from matchmaking.filters.in_memory_matchmaking import (
+    InMemoryItineraryFilters,
+    per_shell,
+)
 from matchmaking.models import Experience
 from matchmaking.tests.factories.in_memory_models import (
     ItineraryDataFactory,
@@ -10,7 +17,10 @@ from matchmaking.tests.factories.in_memory_models import (
     CityDataFactory,
     CountryDataFactory,
     ExperienceTypeDataFactory,
+    LOCATIONS,
+    create_random_catalog,
 )
+from matchmaking.tests.factories.tm_form import TripParametersFactory
 
 
 def test_filter_experience_months():
@@ -209,3 +219,135 @@ def test_filter_severe_dietary_exclusions():
     assert len(itinerary_filter.itineraries) == len(
         itineraries
     ), "No itineraries should be excluded if no severe dietary restriction is present"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_run_fused_matches_run(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+
+    for _ in range(20):
+        trip_params = TripParametersFactory(
+            pace=rng.randint(1, 5),
+            main_month_int=rng.randint(1, 12),
+            dietary=rng.choice([[], [Experience.DietaryRequirement.OTHER_SEVERE]]),
+            location_exclusions=rng.sample(LOCATIONS, rng.randint(0, 2)),
+        )
+
+        expected = InMemoryItineraryFilters(itineraries=itineraries).run(trip_params)
+        fused = InMemoryItineraryFilters(itineraries=itineraries).run_fused(trip_params)
+
+        assert fused == expected
+
+
+def test_predicate_chain_short_circuits():
+    # The month check fails first, so pace never sees the zero-length shell
+    itinerary = ItineraryDataFactory(
+        shell=ShellDataFactory(length=0),
+        experiences=[ExperienceDataFactory(months=[1])],
+    )
+    trip_params = TripParametersFactory(main_month_int=2, location_exclusions=[])
+
+    predicate = InMemoryItineraryFilters.predicate_chain(trip_params)
+
+    assert predicate(itinerary) is False
+
+
+def test_iter_run_consumes_itineraries_lazily():
+    rng = random.Random(0)
+    itineraries = create_random_catalog(rng, size=200)
+    trip_params = TripParametersFactory(pace=4, location_exclusions=[])
+    consumed = []
+
+    def generate():
+        for itinerary in itineraries:
+            consumed.append(itinerary)
+            yield itinerary
+
+    survivors = InMemoryItineraryFilters.iter_run(generate(), trip_params)
+    first = next(survivors)
+
+    assert consumed[-1] is first
+    assert [first, *survivors] == InMemoryItineraryFilters(itineraries=itineraries).run(
+        trip_params
+    )
+
+
+def test_shell_checks_run_once_per_key():
+    # Equal but distinct shells, as a stream of generated itineraries has
+    shells = [
+        ShellDataFactory(length=10, transport_duration_minutes=60) for _ in range(5)
+    ]
+    checked_keys = []
+
+    def check(key):
+        checked_keys.append(key)
+        return True
+
+    shell_check = per_shell(
+        lambda shell: (shell.transport_duration_minutes, shell.length), check
+    )
+
+    assert all(shell_check(shell) for shell in shells)
+    assert checked_keys == [(60, 10)]
+
+
+def test_shell_checks_keep_a_bounded_number_of_results():
+    checked_lengths = []
+
+    def check(length):
+        checked_lengths.append(length)
+        return True
+
+    shell_check = per_shell(lambda shell: shell.length, check, maxsize=2)
+
+    for length in (1, 2, 3, 1):
+        shell_check(ShellDataFactory(length=length))
+
+    # The result for 1 was evicted by 3, so it's checked again
+    assert checked_lengths == [1, 2, 3, 1]
+
+
+def test_instrumented_run_reports_every_stage():
+    itineraries = create_random_catalog(random.Random(0), 200)
+    trip_params = TripParametersFactory(dietary=["other_severe"])
+    hooked = []
+    instrumentation = Instrumentation(hook=hooked.append)
+
+    itinerary_filter = InMemoryItineraryFilters(
+        itineraries=itineraries, instrumentation=instrumentation
+    )
+    result = itinerary_filter.run(trip_params)
+
+    report = itinerary_filter.report
+    assert [stage.stage for stage in report.stages] == [
+        "experience_months",
+        "filter_itinerary_pace",
+        "filter_severe_dietary_exclusions",
+        "filter_location_exclusions",
+    ]
+    assert hooked == report.stages
+    assert report.stages[0].input_count == 200
+    for before, after in zip(report.stages, report.stages[1:]):
+        assert after.input_count == before.output_count
+    assert report.stages[-1].output_count == len(result)
+    assert all(stage.queries == 0 for stage in report.stages)
+    assert result == InMemoryItineraryFilters(itineraries=itineraries).run(trip_params)
+
+
+def test_uninstrumented_run_has_no_report():
+    itinerary_filter = InMemoryItineraryFilters(itineraries=[ItineraryDataFactory()])
+    itinerary_filter.run(TripParametersFactory())
+
+    assert itinerary_filter.report is None
+
+
+def test_arun_matches_run():
+    itineraries = create_random_catalog(random.Random(0), 100)
+    trip_params = TripParametersFactory()
+
+    result = asyncio.run(
+        InMemoryItineraryFilters(itineraries=itineraries).arun(trip_params)
+    )
+
+    assert result == InMemoryItineraryFilters(itineraries=itineraries).run(trip_params)
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.indexed_matchmaking import (
+    IndexedItineraryFilters,
+    ItineraryIndex,
+)
+from matchmaking.models import Experience
+from matchmaking.tests.factories.in_memory_models import (
+    FEARS,
+    LOCATIONS,
+    ExperienceDataFactory,
+    ItineraryDataFactory,
+    create_random_catalog,
+)
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_run_matches_in_memory_filters(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+    index = ItineraryIndex(itineraries)
+
+    for _ in range(20):
+        trip_params = TripParametersFactory(
+            pace=rng.randint(1, 5),
+            main_month_int=rng.randint(1, 12),
+            dietary=rng.choice([[], [Experience.DietaryRequirement.OTHER_SEVERE]]),
+            location_exclusions=[
+                location.upper()
+                for location in rng.sample(LOCATIONS, rng.randint(0, 2))
+            ],
+        )
+
+        expected = InMemoryItineraryFilters(itineraries=itineraries).run(trip_params)
+        indexed = IndexedItineraryFilters(index=index).run(trip_params)
+
+        assert indexed == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_experience_fears_phobias_medical_matches_in_memory_filters(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+    index = ItineraryIndex(itineraries)
+
+    for fears in ([rng.choice(FEARS)], rng.sample(FEARS, 2), ["unknown"], []):
+        expected = InMemoryItineraryFilters(itineraries=itineraries)
+        expected.experience_fears_phobias_medical(fears)
+        indexed = IndexedItineraryFilters(index=index)
+        indexed.experience_fears_phobias_medical(fears)
+
+        assert indexed.itineraries == expected.itineraries
+
+
+def test_month_index():
+    itineraries = [
+        ItineraryDataFactory(
+            experiences=[
+                ExperienceDataFactory(months=[1, 2, 3]),
+                ExperienceDataFactory(months=[2, 3, 4]),
+            ]
+        ),
+        ItineraryDataFactory(experiences=[]),
+    ]
+    index = ItineraryIndex(itineraries)
+
+    assert index.month_ids[1] == set()
+    assert index.month_ids[2] == {0}
+    assert index.without_experiences_ids == {1}
+
+    itinerary_filter = IndexedItineraryFilters(index=index)
+    itinerary_filter.experience_months(2)
+    assert itinerary_filter.itineraries == itineraries
+
+
+def test_unfiltered_itineraries_are_the_whole_catalog():
+    itineraries = [ItineraryDataFactory() for _ in range(3)]
+
+    itinerary_filter = IndexedItineraryFilters(index=ItineraryIndex(itineraries))
+    itinerary_filter.filter_location_exclusions([])
+
+    assert itinerary_filter.ids is None
+    assert itinerary_filter.itineraries == itineraries
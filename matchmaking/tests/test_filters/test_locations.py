@@ -0,0 +1,99 @@
+from matchmaking.filters.compiled_matchmaking import (
+    CompiledCatalog,
+    CompiledItineraryFilters,
+)
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.indexed_matchmaking import (
+    IndexedItineraryFilters,
+    ItineraryIndex,
+)
+from matchmaking.filters.locations import LocationIndex, fold_location
+from matchmaking.tests.factories.in_memory_models import (
+    CityDataFactory,
+    CountryDataFactory,
+    ItineraryDataFactory,
+    ShellDataFactory,
+)
+
+
+def test_fold_location():
+    assert fold_location("Zürich") == "zurich"
+    assert fold_location("SÃO PAULO") == "sao paulo"
+    assert fold_location("Straße") == "strasse"
+
+
+def test_location_index_shares_ids_across_shells():
+    paris = CityDataFactory(name="Paris", country=CountryDataFactory(name="France"))
+    first = ShellDataFactory(flying_to_city=paris)
+    second = ShellDataFactory(flying_back_from_city=paris)
+
+    location_index = LocationIndex()
+    first_ids = location_index.location_ids(first)
+    second_ids = location_index.location_ids(second)
+    (paris_id,) = location_index.resolve(["PARIS"])
+
+    assert paris_id in first_ids
+    assert paris_id in second_ids
+    assert location_index.location_ids(first) is first_ids
+
+
+def test_location_index_resolve_does_not_grow_the_index():
+    location_index = LocationIndex.build([ItineraryDataFactory()])
+    aliases = dict(location_index.aliases)
+
+    assert location_index.resolve(["Atlantis", "El Dorado"]) == frozenset()
+    assert location_index.aliases == aliases
+
+
+def test_exclusions_match_shells_indexed_after_they_are_resolved():
+    location_index = LocationIndex()
+    lisbon = ItineraryDataFactory(
+        shell=ShellDataFactory(flying_to_city=CityDataFactory(name="Lisbon"))
+    )
+    itineraries = [ItineraryDataFactory(), lisbon, ItineraryDataFactory()]
+
+    matches = InMemoryItineraryFilters.filter_location_exclusions_predicate(
+        ["LISBON"], location_index
+    )
+
+    assert [matches(itinerary) for itinerary in itineraries] == [True, False, True]
+
+
+def test_location_index_aliases():
+    itinerary = ItineraryDataFactory(
+        shell=ShellDataFactory(
+            flying_to_city=CityDataFactory(
+                country=CountryDataFactory(name="United States")
+            )
+        )
+    )
+    location_index = LocationIndex.build([itinerary])
+    location_index.add_alias("USA", "United States")
+
+    itinerary_filter = InMemoryItineraryFilters(
+        itineraries=[itinerary], location_index=location_index
+    )
+    itinerary_filter.filter_location_exclusions(location_exclusions=["usa"])
+    assert len(itinerary_filter.itineraries) == 0
+
+
+def test_location_exclusions_ignore_accents():
+    itineraries = [
+        ItineraryDataFactory(
+            shell=ShellDataFactory(flying_to_city=CityDataFactory(name="Zürich"))
+        )
+    ]
+
+    itinerary_filter = InMemoryItineraryFilters(itineraries=itineraries)
+    itinerary_filter.filter_location_exclusions(location_exclusions=["ZURICH"])
+    assert len(itinerary_filter.itineraries) == 0
+
+    compiled_filter = CompiledItineraryFilters(
+        catalog=CompiledCatalog.compile(itineraries)
+    )
+    compiled_filter.filter_location_exclusions(location_exclusions=["ZURICH"])
+    assert len(compiled_filter.itineraries) == 0
+
+    indexed_filter = IndexedItineraryFilters(index=ItineraryIndex(itineraries))
+    indexed_filter.filter_location_exclusions(location_exclusions=["ZURICH"])
+    assert len(indexed_filter.itineraries) == 0
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.memo import StageMemo, bitset_positions, to_bitset
+from matchmaking.models import Experience
+from matchmaking.tests.factories.in_memory_models import (
+    LOCATIONS,
+    create_random_catalog,
+)
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+
+def test_bitsets():
+    flags = [i % 3 == 0 for i in range(20)]
+
+    assert to_bitset(flags) == sum(1 << i for i, flag in enumerate(flags) if flag)
+    assert bitset_positions(to_bitset(flags)) == [0, 3, 6, 9, 12, 15, 18]
+    assert to_bitset([]) == 0
+    assert bitset_positions(0) == []
+
+
+def test_stage_memo_is_dropped_when_the_version_changes():
+    version = 0
+    memo = StageMemo(version=lambda: version)
+    calls = []
+
+    def compute():
+        calls.append(version)
+        return len(calls)
+
+    assert memo.get_or_compute("stage", 1, compute) == 1
+    assert memo.get_or_compute("stage", 1, compute) == 1
+    assert memo.get_or_compute("stage", 2, compute) == 2
+
+    version = 1
+    assert memo.get_or_compute("stage", 1, compute) == 3
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_run_memoized_matches_run(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, size=200)
+    memo = StageMemo()
+
+    for _ in range(30):
+        trip_params = TripParametersFactory(
+            pace=rng.randint(1, 5),
+            main_month_int=rng.randint(1, 3),
+            dietary=rng.choice([[], [Experience.DietaryRequirement.OTHER_SEVERE]]),
+            location_exclusions=rng.sample(LOCATIONS, rng.randint(0, 2)),
+        )
+
+        expected = InMemoryItineraryFilters(itineraries=itineraries).run(trip_params)
+        memoized = InMemoryItineraryFilters(itineraries=itineraries).run_memoized(
+            trip_params, memo=memo
+        )
+
+        assert memoized == expected
+
+
+def test_run_memoized_reuses_stage_candidates():
+    itineraries = create_random_catalog(random.Random(0), size=50)
+    memo = StageMemo()
+    computed = []
+    compute = memo.get_or_compute
+
+    def get_or_compute(stage, argument, compute_candidates):
+        return compute(
+            stage, argument, lambda: computed.append(stage) or compute_candidates()
+        )
+
+    memo.get_or_compute = get_or_compute
+
+    for location_exclusions in (["Paris"], ["Rome"]):
+        InMemoryItineraryFilters(itineraries=itineraries).run_memoized(
+            TripParametersFactory(
+                pace=1, main_month_int=1, location_exclusions=location_exclusions
+            ),
+            memo=memo,
+        )
+
+    assert sorted(computed) == ["experience_months", "filter_itinerary_pace"]
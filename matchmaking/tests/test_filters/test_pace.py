@@ -0,0 +1,33 @@
+import pytest
+
+from matchmaking.filters.pace import (
+    DAY_MINUTES,
+    booked_time_percentage,
+    experience_duration_limit,
+    is_suitable_pace,
+)
+
+
+@pytest.mark.parametrize("pace", [0, 1, 2, 3, 4, 5, 6])
+@pytest.mark.parametrize("transport_duration_minutes", [0, 60, 333, 480])
+@pytest.mark.parametrize("length", [0, 1, 3, 7, 30])
+def test_experience_duration_limit_matches_is_suitable_pace(
+    pace, transport_duration_minutes, length
+):
+    lookup, minutes = experience_duration_limit(
+        pace=pace, transport_duration_minutes=transport_duration_minutes, length=length
+    )
+
+    for total_experience_duration in range(DAY_MINUTES * length + 60):
+        percentage = booked_time_percentage(
+            total_experience_duration=total_experience_duration,
+            transport_duration_minutes=transport_duration_minutes,
+            length=length,
+        )
+        within_limit = (
+            total_experience_duration < minutes
+            if lookup == "lt"
+            else total_experience_duration >= minutes
+        )
+
+        assert within_limit == is_suitable_pace(pace, percentage)
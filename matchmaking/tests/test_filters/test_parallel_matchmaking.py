@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.filters.parallel_matchmaking import ParallelItineraryFilters
+from matchmaking.tests.factories.in_memory_models import (
+    LOCATIONS,
+    create_random_catalog,
+)
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+
+def test_shards_cover_catalog_in_order():
+    itineraries = create_random_catalog(random.Random(0), 10)
+
+    with ParallelItineraryFilters(itineraries, processes=2) as parallel_filters:
+        assert parallel_filters.shards() == [
+            (0, 1),
+            (1, 2),
+            (2, 3),
+            (3, 5),
+            (5, 6),
+            (6, 7),
+            (7, 8),
+            (8, 10),
+        ]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_parallel_run_matches_run(seed):
+    rng = random.Random(seed)
+    itineraries = create_random_catalog(rng, 300)
+
+    with ParallelItineraryFilters(itineraries, processes=2) as parallel_filters:
+        for _ in range(5):
+            trip_params = TripParametersFactory(
+                main_month_int=rng.randint(1, 12),
+                pace=rng.randint(1, 5),
+                dietary=rng.choice([[], ["other_severe"]]),
+                location_exclusions=rng.sample(LOCATIONS, 2),
+            )
+
+            assert parallel_filters.run(trip_params) == InMemoryItineraryFilters(
+                itineraries=itineraries
+            ).run(trip_params)
@@ -1,3 +1,8 @@
+import dataclasses
+
+import pytest
+
+from matchmaking.models import MonthMask
 from matchmaking.tests.factories.in_memory_models import (
     CountryDataFactory,
     CityDataFactory,
@@ -63,3 +68,37 @@ def test_itinerary_data_factory():
     assert len(itinerary.experiences) > 0
     for experience in itinerary.experiences:
         assert len(experience.months) > 0
+
+
+def test_month_mask():
+    months = MonthMask.from_months([3, 1, 12])
+
+    assert months == 0b100000000101
+    assert list(months) == [1, 3, 12]
+    assert len(months) == 3
+    assert 3 in months
+    assert 2 not in months
+    assert 0 not in months
+    assert MonthMask.from_months([1, 3, 12]) is months
+
+    # Not months, but allowed by the database, so one bad row can't break loading
+    assert MonthMask.from_months([0, 2, 13]) is MonthMask.from_months([2])
+
+
+def test_experience_data_is_compact():
+    experience = ExperienceDataFactory(months=[1, 2], fears_phobias_medical=["heights"])
+
+    assert isinstance(experience.months, MonthMask)
+    assert isinstance(experience.experience_types, tuple)
+    assert isinstance(experience.fears_phobias_medical, tuple)
+    assert not hasattr(experience, "__dict__")
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        experience.duration_minutes = 0
+
+
+def test_names_are_interned():
+    first = CityDataFactory(name="".join(["Pa", "ris"]))
+    second = CityDataFactory(name="".join(["Par", "is"]))
+
+    assert first.name is second.name
@@ -0,0 +1,77 @@
+import itertools
+import random
+
+import pytest
+
+from matchmaking.filters.in_memory_matchmaking import InMemoryItineraryFilters
+from matchmaking.models import Experience
+from matchmaking.second_tier import generate_second_tier_itineraries
+from matchmaking.tests.factories.in_memory_models import (
+    FEARS,
+    LOCATIONS,
+    ExperienceDataFactory,
+    ShellDataFactory,
+    create_random_catalog,
+)
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+
+
+def create_candidates(rng):
+    itineraries = create_random_catalog(rng, size=30)
+    experiences = [
+        experience for itinerary in itineraries for experience in itinerary.experiences
+    ]
+
+    return [
+        (itinerary.shell, rng.sample(experiences, 7)) for itinerary in itineraries[:6]
+    ]
+
+
+def test_generates_every_combination():
+    shell = ShellDataFactory()
+    experiences = [ExperienceDataFactory() for _ in range(5)]
+
+    itineraries = list(
+        generate_second_tier_itineraries(
+            candidates=[(shell, experiences)], experiences_per_itinerary=3
+        )
+    )
+
+    assert [itinerary.experiences for itinerary in itineraries] == [
+        combination for combination in itertools.combinations(experiences, 3)
+    ]
+    assert all(itinerary.shell is shell for itinerary in itineraries)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pushdown_matches_filtering_every_combination(seed):
+    rng = random.Random(seed)
+    candidates = create_candidates(rng)
+    every_combination = list(
+        generate_second_tier_itineraries(
+            candidates=candidates, experiences_per_itinerary=3
+        )
+    )
+
+    for _ in range(10):
+        trip_params = TripParametersFactory(
+            pace=rng.randint(1, 5),
+            main_month_int=rng.randint(1, 12),
+            fears_phobias_medical=rng.sample(FEARS, rng.randint(0, 2)),
+            dietary=rng.choice([[], [Experience.DietaryRequirement.OTHER_SEVERE]]),
+            location_exclusions=rng.sample(LOCATIONS, rng.randint(0, 1)),
+        )
+
+        itinerary_filter = InMemoryItineraryFilters(itineraries=every_combination)
+        itinerary_filter.experience_fears_phobias_medical(
+            trip_params.fears_phobias_medical
+        )
+        expected = itinerary_filter.run(trip_params)
+
+        generated = generate_second_tier_itineraries(
+            candidates=candidates,
+            experiences_per_itinerary=3,
+            trip_params=trip_params,
+        )
+
+        assert list(generated) == expected
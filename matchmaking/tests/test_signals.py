@@ -0,0 +1,211 @@
+import pytest
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+
+from matchmaking import signals
+from matchmaking.models import City, Country, Experience, ExperienceType, Itinerary
+from matchmaking.signals import (
+    CATALOG_M2M_THROUGH_MODELS,
+    CATALOG_MODELS,
+    summarised_itineraries,
+    summary_relations_changed,
+    summary_source_deleted,
+    summary_source_deleting,
+    summary_source_saved,
+)
+
+
+def sql(itineraries, connection):
+    return itineraries.query.get_compiler(connection=connection).as_sql()
+
+
+@pytest.fixture
+def rebuilt(monkeypatch):
+    """
+    The querysets the summaries are rebuilt for, instead of rebuilding them
+    """
+    rebuilt = []
+    monkeypatch.setattr(signals, "rebuild_summaries", rebuilt.append)
+    return rebuilt
+
+
+@pytest.fixture
+def looked_up(monkeypatch):
+    """
+    The querysets the itinerary ids are taken from, each standing for ids 1 and 2
+    """
+    looked_up = []
+
+    def itinerary_ids(itineraries):
+        looked_up.append(itineraries)
+        return [1, 2]
+
+    monkeypatch.setattr(signals, "_itinerary_ids", itinerary_ids)
+    return looked_up
+
+
+@pytest.mark.parametrize("model", [User, Session, LogEntry])
+def test_unrelated_models_have_no_receivers(model):
+    for signal in (post_save, pre_delete, post_delete):
+        assert not signal.has_listeners(model)
+
+
+@pytest.mark.parametrize("model", CATALOG_MODELS)
+def test_catalog_models_have_receivers(model):
+    assert post_save.has_listeners(model)
+    assert post_delete.has_listeners(model)
+
+
+@pytest.mark.parametrize("through_model", CATALOG_M2M_THROUGH_MODELS)
+def test_catalog_through_models_have_receivers(through_model):
+    assert m2m_changed.has_listeners(through_model)
+    # Rows of the through tables can still be fast deleted
+    assert not post_delete.has_listeners(through_model)
+
+
+def test_unrelated_relations_have_no_m2m_receivers():
+    assert not m2m_changed.has_listeners(User.groups.through)
+
+
+@pytest.mark.parametrize(
+    "model, pks", [(User, [1]), (City, []), (City, None), (Country, [])]
+)
+def test_summarised_itineraries_none(model, pks):
+    assert summarised_itineraries(model, pks).query.is_empty()
+
+
+def test_summarised_itineraries_follows_every_lookup(postgresql):
+    query, params = sql(summarised_itineraries(City, [5]), postgresql)
+
+    assert query.startswith("SELECT DISTINCT")
+    assert (
+        '("matchmaking_destination"."primary_city_id" IN (%s) '
+        'OR "matchmaking_shell"."flying_to_city_id" IN (%s) '
+        'OR "matchmaking_shell"."flying_back_from_city_id" IN (%s))'
+    ) in query
+    assert params == (5, 5, 5)
+
+
+def test_saved_source_rebuilds_its_itineraries(rebuilt, postgresql):
+    city = City(id=5, name="Lisbon", country_id="Portugal")
+
+    summary_source_saved(sender=City, instance=city)
+
+    assert [sql(itineraries, postgresql) for itineraries in rebuilt] == [
+        sql(summarised_itineraries(City, [5]), postgresql)
+    ]
+
+
+def test_raw_saves_are_not_rebuilt(rebuilt):
+    summary_source_saved(sender=City, instance=City(id=5), raw=True)
+
+    assert rebuilt == []
+
+
+def test_deleted_source_rebuilds_the_itineraries_found_before(
+    rebuilt, looked_up, postgresql
+):
+    experience = Experience(id=7)
+
+    summary_source_deleting(sender=Experience, instance=experience)
+    summary_source_deleted(sender=Experience, instance=experience)
+
+    assert [sql(itineraries, postgresql) for itineraries in looked_up] == [
+        sql(summarised_itineraries(Experience, [7]), postgresql)
+    ]
+    assert [sql(itineraries, postgresql) for itineraries in rebuilt] == [
+        sql(Itinerary.objects.filter(id__in=[1, 2]), postgresql)
+    ]
+
+
+@pytest.mark.parametrize(
+    "sender, instance, actions, pk_set, side, changed",
+    [
+        # itinerary.experiences.add(experience)
+        (
+            Itinerary.experiences.through,
+            Itinerary(id=3),
+            ("pre_add", "post_add"),
+            {7},
+            Itinerary,
+            [3],
+        ),
+        # experience.itinerary_set.remove(*itineraries)
+        (
+            Itinerary.experiences.through,
+            Experience(id=7),
+            ("pre_remove", "post_remove"),
+            {3, 4},
+            Itinerary,
+            [3, 4],
+        ),
+        # experience.experience_types.add(experience_type)
+        (
+            Experience.experience_types.through,
+            Experience(id=7),
+            ("pre_add", "post_add"),
+            {2},
+            Experience,
+            [7],
+        ),
+        # experience_type.experience_set.remove(experience)
+        (
+            Experience.experience_types.through,
+            ExperienceType(id=2),
+            ("pre_remove", "post_remove"),
+            {7},
+            Experience,
+            [7],
+        ),
+        # experience.theme_minimum_ratings.clear()
+        (
+            Experience.theme_minimum_ratings.through,
+            Experience(id=7),
+            ("pre_clear", "post_clear"),
+            None,
+            Experience,
+            [7],
+        ),
+    ],
+)
+def test_changed_relations_rebuild_the_summarised_side(
+    rebuilt, looked_up, postgresql, sender, instance, actions, pk_set, side, changed
+):
+    for action in actions:
+        summary_relations_changed(
+            sender=sender, instance=instance, action=action, pk_set=pk_set
+        )
+
+    # Nothing is looked up before, and the other side's itineraries aren't rebuilt
+    assert looked_up == []
+    assert [sql(itineraries, postgresql) for itineraries in rebuilt] == [
+        sql(summarised_itineraries(side, changed), postgresql)
+    ]
+
+
+def test_relations_cleared_from_the_other_side_are_found_before(
+    rebuilt, looked_up, postgresql
+):
+    experience_type = ExperienceType(id=2)
+
+    for action in ("pre_clear", "post_clear"):
+        summary_relations_changed(
+            sender=Experience.experience_types.through,
+            instance=experience_type,
+            action=action,
+            pk_set=None,
+        )
+
+    assert [sql(itineraries, postgresql) for itineraries in looked_up] == [
+        sql(summarised_itineraries(ExperienceType, [2]), postgresql)
+    ]
+    assert [sql(itineraries, postgresql) for itineraries in rebuilt] == [
+        sql(Itinerary.objects.filter(id__in=[1, 2]), postgresql)
+    ]
@@ -0,0 +1,94 @@
+import math
+
+import pytest
+
+from matchmaking.models import ExperienceThemes, Month
+from matchmaking.summaries import summarise
+from matchmaking.tests.factories.in_memory_models import (
+    CityDataFactory,
+    CountryDataFactory,
+    DestinationDataFactory,
+    ExperienceDataFactory,
+    ExperienceThemeMinimumRatingsDataFactory,
+    ExperienceTypeDataFactory,
+    ItineraryDataFactory,
+    ShellDataFactory,
+)
+
+
+def test_summarise_without_experiences():
+    summary = summarise(ItineraryDataFactory(id=1, experiences=[]))
+
+    assert summary.itinerary_id == 1
+    assert summary.months == sorted(Month.values)
+    assert summary.fears_phobias_medical == []
+    assert summary.has_food_experience is False
+    assert summary.total_experience_minutes == 0
+    assert summary.theme_minimum_ratings == {
+        theme: 0 for theme in ExperienceThemes.values
+    }
+
+
+def test_summarise_experiences():
+    experiences = [
+        ExperienceDataFactory(
+            months=[1, 2, 3],
+            fears_phobias_medical=["Heights"],
+            unsuitable_for_dietary_requirement=["Vegan"],
+            experience_types=[ExperienceTypeDataFactory(name="Dining experience")],
+            theme_minimum_ratings=[
+                ExperienceThemeMinimumRatingsDataFactory(
+                    theme=ExperienceThemes.OUTDOOR.value, rating=2
+                )
+            ],
+            duration_minutes=60,
+        ),
+        ExperienceDataFactory(
+            months=[2, 3, 4],
+            fears_phobias_medical=["Water", "Heights"],
+            unsuitable_for_dietary_requirement=[],
+            experience_types=[ExperienceTypeDataFactory(name="Hiking")],
+            theme_minimum_ratings=[
+                ExperienceThemeMinimumRatingsDataFactory(
+                    theme=ExperienceThemes.OUTDOOR.value, rating=4
+                )
+            ],
+            duration_minutes=90,
+        ),
+    ]
+
+    summary = summarise(ItineraryDataFactory(id=7, experiences=experiences))
+
+    assert summary.months == [2, 3]
+    assert summary.fears_phobias_medical == ["Heights", "Water"]
+    assert summary.unsuitable_for_dietary_requirement == ["Vegan"]
+    assert summary.has_food_experience is True
+    assert summary.has_dining_experience is True
+    assert summary.total_experience_minutes == 150
+    assert summary.theme_minimum_ratings[ExperienceThemes.OUTDOOR] == 4
+
+
+def test_summarise_lower_cases_locations():
+    lisbon = CityDataFactory(name="Lisbon", country=CountryDataFactory(name="Portugal"))
+    shell = ShellDataFactory(
+        destination=DestinationDataFactory(primary_city=lisbon),
+        flying_to_city=lisbon,
+        flying_back_from_city=lisbon,
+    )
+
+    summary = summarise(ItineraryDataFactory(id=1, shell=shell))
+
+    assert summary.location_tokens == ["lisbon", "portugal"]
+
+
+def test_summarise_needs_an_id():
+    with pytest.raises(ValueError):
+        summarise(ItineraryDataFactory(experiences=[]))
+
+
+def test_summarise_shell_without_days():
+    summary = summarise(
+        ItineraryDataFactory(id=1, shell=ShellDataFactory(length=0), experiences=[])
+    )
+
+    assert summary.booked_time_percentage == math.inf
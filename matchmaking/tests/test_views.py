@@ -0,0 +1,163 @@
+import asyncio
+import dataclasses
+import json
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from matchmaking import views
+from matchmaking.models import Itinerary
+from matchmaking.tests.factories.tm_form import TripParametersFactory
+from matchmaking.tm_form import TripParameters
+
+
+def test_trip_parameters_from_dict_round_trips():
+    trip_params = TripParametersFactory()
+
+    assert TripParameters.from_dict(dataclasses.asdict(trip_params)) == trip_params
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"pace": "fast"},
+        {"ratings": [1, 2]},
+        {"dietary": "vegan"},
+        {"location_exclusions": [1]},
+    ],
+)
+def test_trip_parameters_from_dict_rejects_wrong_types(change):
+    data = {**dataclasses.asdict(TripParametersFactory()), **change}
+
+    with pytest.raises((TypeError, ValueError)):
+        TripParameters.from_dict(data)
+
+
+@pytest.mark.parametrize("rating", [0, -1, 5.5, float("nan")])
+def test_trip_parameters_from_dict_rejects_out_of_range_ratings(rating):
+    data = dataclasses.asdict(TripParametersFactory())
+    data["ratings"]["food"] = rating
+
+    with pytest.raises(ValueError):
+        TripParameters.from_dict(data)
+
+
+def test_matchmaking_only_accepts_post(client):
+    response = client.get(reverse("matchmaking:matchmaking"))
+
+    assert response.status_code == 405
+
+
+@pytest.mark.parametrize(
+    "query, body",
+    [
+        ("", "not json"),
+        ("", json.dumps({"pace": 1})),
+        ("?limit=0", None),
+        ("?after=-1", None),
+    ],
+)
+def test_matchmaking_rejects_bad_requests(client, query, body):
+    if body is None:
+        body = json.dumps(dataclasses.asdict(TripParametersFactory()))
+
+    response = client.post(
+        reverse("matchmaking:matchmaking") + query,
+        body,
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+
+def test_matchmaking_rejects_all_zero_ratings(client):
+    data = dataclasses.asdict(TripParametersFactory())
+    data["ratings"] = dict.fromkeys(data["ratings"], 0)
+
+    response = client.post(
+        reverse("matchmaking:matchmaking"),
+        json.dumps(data),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+
+
+def test_matchmaking_needs_no_csrf_token():
+    # Invalid, so that it's answered without touching the database
+    response = Client(enforce_csrf_checks=True).post(
+        reverse("matchmaking:matchmaking"),
+        json.dumps({"pace": 1}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+
+
+def test_page_query_is_keyset_paginated(postgresql):
+    query = views._page_query(Itinerary.objects.all(), after=41, size=100)
+
+    sql, params = query.query.get_compiler(connection=postgresql).as_sql()
+
+    assert sql.endswith(
+        'WHERE "matchmaking_itinerary"."id" > %s '
+        'ORDER BY "matchmaking_itinerary"."id" ASC LIMIT 100'
+    )
+    assert params == (41,)
+
+
+# Itinerary id: (shell id, experience ids)
+CATALOG = {1: (10, [100, 101]), 2: (10, [101]), 3: (11, []), 4: (11, [102])}
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    async def fetch_page(itineraries, after, size):
+        ids = sorted(id for id in CATALOG if id > after)[:size]
+        return [(id, CATALOG[id][0]) for id in ids]
+
+    async def fetch_experience_ids(itinerary_ids):
+        return {id: CATALOG[id][1] for id in itinerary_ids if CATALOG[id][1]}
+
+    async def fetch_by_id(ids):
+        return [{"id": id} for id in sorted(ids)]
+
+    monkeypatch.setattr(views, "_fetch_page", fetch_page)
+    monkeypatch.setattr(views, "_fetch_experience_ids", fetch_experience_ids)
+    monkeypatch.setattr(views, "_fetch_shells", fetch_by_id)
+    monkeypatch.setattr(views, "_fetch_experiences", fetch_by_id)
+    monkeypatch.setattr(views, "FETCH_SIZE", 2)
+
+
+def stream(after, limit):
+    async def collect():
+        return [
+            json.loads(line)
+            async for line in views.stream_matches(None, after=after, limit=limit)
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_stream_matches_sends_each_shell_and_experience_once(catalog):
+    assert stream(after=0, limit=3) == [
+        {"shell": {"id": 10}},
+        {"experience": {"id": 100}},
+        {"experience": {"id": 101}},
+        {"itinerary": {"id": 1, "shell": 10, "experiences": [100, 101]}},
+        {"itinerary": {"id": 2, "shell": 10, "experiences": [101]}},
+        {"shell": {"id": 11}},
+        {"itinerary": {"id": 3, "shell": 11, "experiences": []}},
+        {"next": 3},
+    ]
+
+
+def test_stream_matches_ends_with_no_cursor(catalog):
+    assert stream(after=3, limit=5) == [
+        {"shell": {"id": 11}},
+        {"experience": {"id": 102}},
+        {"itinerary": {"id": 4, "shell": 11, "experiences": [102]}},
+        {"next": None},
+    ]
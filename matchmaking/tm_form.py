@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import asdict, astuple, dataclass, field
+from typing import Any, Dict
 
 
 # This data comes from the Typeform that leads fill out from our website.
@@ -18,6 +19,32 @@ class TripParameters:
     location_exclusions: list[str]  # places (cities / countries)
     main_month_int: int  # corresponds to Month
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TripParameters:
+        """
+        Build trip parameters from their JSON form, with ratings as an object.
+        Raises KeyError, TypeError or ValueError when a value is missing, of
+        the wrong type or out of range.
+        """
+        if not isinstance(data.get("ratings"), dict):
+            raise TypeError("ratings must be an object")
+
+        ratings = {key: float(value) for key, value in data["ratings"].items()}
+        # Ratings are normalised against the highest, so none can be 0
+        if not all(0 < rating <= 5 for rating in ratings.values()):
+            raise ValueError("ratings must be over 0 and at most 5")
+
+        return cls(
+            num_travellers=int(data["num_travellers"]),
+            length=int(data["length"]),
+            ratings=TmFormRatings(**ratings),
+            pace=int(data["pace"]),
+            fears_phobias_medical=_strings(data["fears_phobias_medical"]),
+            dietary=_strings(data["dietary"]),
+            location_exclusions=_strings(data["location_exclusions"]),
+            main_month_int=int(data["main_month_int"]),
+        )
+
 
 @dataclass(frozen=True)
 class TmFormRatings:
@@ -70,3 +97,10 @@ class TmFormRatings:
         }
         ratings = TmFormRatings(**normalised_ratings_dict)
         return ratings
+
+
+def _strings(values: Any) -> list[str]:
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise TypeError(f"{values!r} isn't a list of strings")
+
+    return values
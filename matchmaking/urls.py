@@ -0,0 +1,10 @@
+from django.urls import path
+
+from matchmaking import views
+
+app_name = "matchmaking"
+
+urlpatterns = [
+    # django-stubs doesn't type async views for path() yet
+    path("matchmaking/", views.matchmaking, name="matchmaking"),  # type: ignore[arg-type]
+]
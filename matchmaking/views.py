@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Set, Tuple
+
+from django.db.models import F, QuerySet
+from django.http import (
+    HttpRequest,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBase
+
+from matchmaking.models import Experience, Itinerary, Shell
+from matchmaking.tm_form import TripParameters
+
+if TYPE_CHECKING:
+    from django.db.models.query import _QuerySet
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# Itineraries fetched by each query while a page streams
+FETCH_SIZE = 100
+
+
+def _line(**values: Any) -> str:
+    return json.dumps(values, separators=(",", ":")) + "\n"
+
+
+async def _fetch_shells(shell_ids: Set[int]) -> List[Dict[str, Any]]:
+    return [
+        dict(shell)
+        async for shell in Shell.objects.filter(id__in=shell_ids)
+        .order_by("id")
+        .values(
+            "id",
+            "length",
+            "transport_duration_minutes",
+            destination_name=F("destination__name"),
+            primary_city_name=F("destination__primary_city__name"),
+            primary_country_name=F("destination__primary_city__country__name"),
+            flying_to_city_name=F("flying_to_city__name"),
+            flying_to_country_name=F("flying_to_city__country__name"),
+            flying_back_from_city_name=F("flying_back_from_city__name"),
+            flying_back_from_country_name=F("flying_back_from_city__country__name"),
+        )
+    ]
+
+
+async def _fetch_experiences(experience_ids: Set[int]) -> List[Dict[str, Any]]:
+    experience_types: Dict[int, List[str]] = {}
+    async for experience_id, name in (
+        Experience.experience_types.through.objects.filter(
+            experience_id__in=experience_ids
+        )
+        .order_by("id")
+        .values_list("experience_id", "experiencetype__name")
+    ):
+        experience_types.setdefault(experience_id, []).append(name)
+
+    return [
+        {**experience, "experience_types": experience_types.get(experience["id"], [])}
+        async for experience in Experience.objects.filter(id__in=experience_ids)
+        .order_by("id")
+        .values("id", "months", "duration_minutes")
+    ]
+
+
+def _page_query(
+    itineraries: QuerySet[Itinerary], after: int, size: int
+) -> _QuerySet[Itinerary, Tuple[int, int]]:
+    return (
+        itineraries.filter(id__gt=after)
+        .order_by("id")
+        .values_list("id", "shell_id")[:size]
+    )
+
+
+async def _fetch_page(
+    itineraries: QuerySet[Itinerary], after: int, size: int
+) -> List[Tuple[int, int]]:
+    return [row async for row in _page_query(itineraries, after, size)]
+
+
+async def _fetch_experience_ids(itinerary_ids: List[int]) -> Dict[int, List[int]]:
+    experience_ids: Dict[int, List[int]] = {}
+    async for itinerary_id, experience_id in (
+        Itinerary.experiences.through.objects.filter(itinerary_id__in=itinerary_ids)
+        .order_by("id")
+        .values_list("itinerary_id", "experience_id")
+    ):
+        experience_ids.setdefault(itinerary_id, []).append(experience_id)
+
+    return experience_ids
+
+
+async def stream_matches(
+    itineraries: QuerySet[Itinerary], after: int, limit: int
+) -> AsyncIterator[str]:
+    """
+    Stream up to limit of the itineraries with an id over after, as JSON lines.
+
+    Each itinerary line only has the ids of its shell and experiences. Every
+    shell and experience is sent once, on a line of its own before the first
+    itinerary that uses it. The last line has the cursor to pass as after for
+    the next page, null when there are no more.
+    """
+    sent_shell_ids: Set[int] = set()
+    sent_experience_ids: Set[int] = set()
+    cursor, sent = after, 0
+    exhausted = False
+
+    while sent < limit:
+        fetch_size = min(FETCH_SIZE, limit - sent)
+        rows = await _fetch_page(itineraries, after=cursor, size=fetch_size)
+
+        if not rows:
+            exhausted = True
+            break
+
+        itinerary_experience_ids = await _fetch_experience_ids(
+            [itinerary_id for itinerary_id, _ in rows]
+        )
+
+        new_shell_ids = {shell_id for _, shell_id in rows} - sent_shell_ids
+        if new_shell_ids:
+            for shell in await _fetch_shells(new_shell_ids):
+                yield _line(shell=shell)
+            sent_shell_ids |= new_shell_ids
+
+        new_experience_ids = {
+            experience_id
+            for experience_ids in itinerary_experience_ids.values()
+            for experience_id in experience_ids
+        } - sent_experience_ids
+        if new_experience_ids:
+            for experience in await _fetch_experiences(new_experience_ids):
+                yield _line(experience=experience)
+            sent_experience_ids |= new_experience_ids
+
+        for itinerary_id, shell_id in rows:
+            yield _line(
+                itinerary={
+                    "id": itinerary_id,
+                    "shell": shell_id,
+                    "experiences": itinerary_experience_ids.get(itinerary_id, []),
+                }
+            )
+
+        sent += len(rows)
+        cursor = rows[-1][0]
+
+        if len(rows) < fetch_size:
+            exhausted = True
+            break
+
+    yield _line(next=None if exhausted else cursor)
+
+
+def _parse_page(request: HttpRequest) -> Tuple[int, int]:
+    after = int(request.GET.get("after", 0))
+    limit = int(request.GET.get("limit", PAGE_SIZE))
+
+    if after < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be 1 to {MAX_PAGE_SIZE}, after at least 0")
+
+    return after, limit
+
+
+async def matchmaking(request: HttpRequest) -> HttpResponseBase:
+    """
+    Matchmake the TripParameters posted as JSON, a page at a time in order of
+    itinerary id, passing the previous page's cursor as ?after=.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        after, limit = _parse_page(request)
+        trip_params = TripParameters.from_dict(json.loads(request.body))
+    except (KeyError, TypeError, ValueError, AttributeError) as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    itineraries = Itinerary.objects.after_matchmaking_filters(trip_params=trip_params)
+
+    return StreamingHttpResponse(
+        stream_matches(itineraries, after=after, limit=limit),
+        content_type="application/x-ndjson",
+    )
+
+
+# Called by servers rather than browsers, and reads no cookies or session, so
+# there's nothing for CSRF protection to protect. Set directly as csrf_exempt()
+# can't wrap async views before Django 5.0.
+matchmaking.csrf_exempt = True  # type: ignore[attr-defined]